@@ -82,7 +82,7 @@ def dashboard():
     ctx = _base_context()
     ctx.update({
         'section':          'dashboard',
-        'total_users':      _safe(lambda: sum(models.get_user_count_by_plan().values()), 0),
+        'total_users':      sum(by_plan.values()),
         'new_this_month':   _safe(models.get_new_users_this_month, 0),
         'total_revenue':    _safe(models.get_total_revenue, 0.0),
         'active_subs':      _safe(models.get_active_subscription_count, 0),
@@ -536,6 +536,9 @@ def api_run_migrations():
         ('onboarding',               models.migrate_onboarding),
         ('api_usage_log',            models.migrate_api_usage_log),
         ('admin activity tracking',  models.migrate_admin_activity_tracking),
+        ('analytics indexes',        models.migrate_analytics_indexes),
+        ('lookup indexes',           models.migrate_lookup_indexes),
+        ('idempotency keys',         models.migrate_idempotency_keys),
     ]
 
     for entry in migration_fns:
@@ -162,6 +162,30 @@ except Exception as _rc_err:
 _ai_helper_instance: Optional['AIHelper'] = None
 _ai_helper_lock     = threading.Lock()
 
+# ── Gemini HTTP transport ─────────────────────────────────────────────────────
+# The singleton owns one genai.Client, and with it one httpx connection pool.
+# httpx's default keep-alive expiry (5s) is shorter than the gap between most
+# Gemini calls here (FAQ uploads, sporadic chat turns), so idle sockets were
+# being dropped and every call paid a fresh TCP+TLS handshake. Keep them warm.
+_GENAI_KEEPALIVE_CONNECTIONS = 20
+_GENAI_KEEPALIVE_EXPIRY_SEC  = 60
+
+
+def _genai_http_options() -> Optional[Any]:
+    """HttpOptions carrying pooled-client limits, or None on SDKs without client_args."""
+    try:
+        import httpx
+        from google.genai import types as _genai_types
+        return _genai_types.HttpOptions(client_args={
+            'limits': httpx.Limits(
+                max_keepalive_connections=_GENAI_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=_GENAI_KEEPALIVE_EXPIRY_SEC,
+            ),
+        })
+    except Exception as e:
+        logger.info(f"[AIHelper] default genai transport (no client_args support): {e}")
+        return None
+
 # ── Lead extraction — regex (no Gemini call) ──────────────────────────────────
 _EMAIL_RE   = re.compile(
     # FIX: was r'\b[\w.+-]+@[\w-]+\.[a-zA-Z]{2,}\b' — the domain part only
@@ -280,7 +304,9 @@ class AIHelper:
 
         if self.enabled:
             try:
-                self._genai_client = genai.Client(api_key=api_key)
+                self._genai_client = genai.Client(
+                    api_key=api_key, http_options=_genai_http_options(),
+                )
                 self.model = self._genai_client.models
                 self._model_name = model_name
                 logger.info(f"[AIHelper] google.genai ready model={model_name}")
@@ -30,7 +30,7 @@ import warnings as _warnings
 from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as _FuturesTimeout
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
 from io import StringIO
 from logging.handlers import RotatingFileHandler
 
@@ -38,8 +38,8 @@ from logging.handlers import RotatingFileHandler
 import requests
 from authlib.integrations.flask_client import OAuth as _OAuth
 from dotenv import load_dotenv
-from flask import (Flask, flash, jsonify, redirect, render_template,
-                   request, session, url_for)
+from flask import (Flask, Response, flash, g, jsonify, redirect,
+                   render_template, request, session, url_for)
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -55,7 +55,8 @@ import models
 import shopify_connect
 import webhooks as _webhooks
 from ai_helper import get_ai_helper
-from app_utils import sanitize_input
+from app_utils import (ORJSON_AVAILABLE, OrjsonProvider, sanitize_input,
+                       verify_webhook_request)
 from bot_protection import register_bot_protection
 from config import Config
 
@@ -63,8 +64,9 @@ load_dotenv()
 
 # ── Thread pools ──────────────────────────────────────────────────────────────
 # Defined before app creation so blueprints can receive them via init_*().
-_dns_executor = ThreadPoolExecutor(max_workers=4,  thread_name_prefix='dns-check')
-_wh_executor  = ThreadPoolExecutor(max_workers=8,  thread_name_prefix='wh-deliver')
+_dns_executor     = ThreadPoolExecutor(max_workers=4,  thread_name_prefix='dns-check')
+_wh_executor      = ThreadPoolExecutor(max_workers=8,  thread_name_prefix='wh-deliver')
+_billing_executor = ThreadPoolExecutor(max_workers=2,  thread_name_prefix='billing')
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # APP CREATION
@@ -72,6 +74,11 @@ _wh_executor  = ThreadPoolExecutor(max_workers=8,  thread_name_prefix='wh-delive
 
 app = Flask(__name__)
 
+# ── JSON: orjson for request.get_json()/jsonify when it's installed; same
+# output as Flask's default provider (see app_utils.OrjsonProvider).
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+
 # ── Trust the deploy platform's reverse proxy (Render/Railway/etc. terminate
 # TLS in front of this app — Flask sees plain http internally otherwise).
 # Without this, url_for(..., _external=True) builds http:// URLs even though
@@ -415,7 +422,7 @@ VALID_VERTICALS = set(VERTICAL_PROMPTS.keys())
 
 # ── Keyword matcher constants ─────────────────────────────────────────────────
 
-STOP_WORDS = {
+STOP_WORDS = frozenset({
     'a', 'an', 'the', 'this', 'that', 'these', 'those',
     'i', 'me', 'my', 'we', 'our', 'you', 'your', 'it', 'its',
     'he', 'she', 'they', 'them', 'their',
@@ -433,7 +440,7 @@ STOP_WORDS = {
     'what', 'where', 'which', 'who', 'why', 'how',
     'any', 'all', 'some', 'more', 'most', 'many', 'much',
     'no', 'not', 'nor', 'there', 'per', 'each',
-}
+})
 
 GENERIC_TAGS = {
     'information', 'info', 'details', 'learn',
@@ -623,6 +630,22 @@ def enforce_subscriptions() -> list:
         return []
 
 
+# ── Current user's plan (per-request memo) ────────────────────────────────────
+# Plan-gated pages need the *fresh* plan_type (the session-cached User may be
+# stale right after an upgrade), which costs a users-table read. Memoized on
+# flask.g so any further lookup in the same request reuses the first row.
+
+def current_plan() -> tuple:
+    """Return (fresh_user, plan_type, plan_limits) for current_user."""
+    if '_current_plan' not in g:
+        fresh_user = models.get_user_by_id(current_user.id)
+        plan_type  = (fresh_user or {}).get('plan_type', current_user.plan_type)
+        g._current_plan = (
+            fresh_user, plan_type, PLAN_LIMITS.get(plan_type, PLAN_LIMITS['free'])
+        )
+    return g._current_plan
+
+
 # ── Client owner plan cache ───────────────────────────────────────────────────
 # 60-second TTL avoids 2 extra DB round-trips on every chat message.
 # Thread-safe: double-checked locking pattern prevents stale overwrites.
@@ -655,9 +678,21 @@ def _get_cached_client_owner(client_id: str):
 # Used only when AI is disabled or the RAG pipeline fails.
 # Will move to services/faq_service.py in the next refactor phase.
 
+_KEYWORD_RE = re.compile(r'\b[a-z]{3,}\b')   # length floor lives in the pattern
+
+
+@lru_cache(maxsize=4096)
+def _extract_keywords_cached(text: str) -> tuple:
+    # Tuple so the cached value can't be mutated by a caller. find_best_match
+    # re-extracts every FAQ question on every chat message, and uploads
+    # re-extract repeated questions — both hit this cache.
+    return tuple(
+        w for w in _KEYWORD_RE.findall(text.lower()) if w not in STOP_WORDS
+    )
+
+
 def extract_keywords(text: str) -> list:
-    words = re.findall(r'\b[a-z]+\b', text.lower())
-    return [w for w in words if w not in STOP_WORDS and len(w) >= 3]
+    return list(_extract_keywords_cached(text))
 
 
 def compute_tag_weights(faqs_list: list) -> dict:
@@ -883,7 +918,8 @@ def log_conversation(client_id, user_message, bot_response,
                 '''
                 WITH today_count AS (
                     SELECT COUNT(*) AS cnt FROM conversations
-                    WHERE  client_id = %s AND DATE(timestamp) = CURRENT_DATE
+                    WHERE  client_id = %s
+                      AND  timestamp >= CURRENT_DATE AND timestamp < CURRENT_DATE + 1
                 )
                 INSERT INTO conversations
                     (client_id, user_message, bot_response, matched, method,
@@ -999,6 +1035,9 @@ try:
         'migrate_cart_recovery',               # abandoned_carts table + clients.cart_recovery_enabled
         'migrate_usage_notifications',         # usage_notifications table + clients.ai_unavailable_mode/human_support_contact
         'migrate_admin_activity_tracking',     # admin dashboard: users activity cols + analytics_events IP/UA
+        'migrate_analytics_indexes',           # (client_id, timestamp) indexes for the analytics page
+        'migrate_lookup_indexes',              # FK-column indexes (clients.user_id, faqs.client_id, ...)
+        'migrate_idempotency_keys',            # inbound webhook dedupe (idempotency_keys table)
     ]
     for _fn in _optional_migrations:
         if hasattr(models, _fn):
@@ -1130,6 +1169,7 @@ init_faqs(
     plan_limits=PLAN_LIMITS,
     ai_helper=ai_helper,
     extract_keywords=extract_keywords,
+    current_plan=current_plan,
 )
 app.register_blueprint(faqs_bp)
 
@@ -1140,7 +1180,8 @@ app.register_blueprint(faqs_bp)
 # TODO(legacy, out of scope): update billing.py's own pricing table to only
 # price Starter/Growth/Scale, since that's a change to billing.py.
 from blueprints.billing import billing_bp, init_billing
-init_billing(mail=mail, get_subscription_status=get_subscription_status)
+init_billing(mail=mail, get_subscription_status=get_subscription_status,
+             executor=_billing_executor)
 app.register_blueprint(billing_bp)
 
 # Agency (stripped down — single-store analytics/dashboard only, see
@@ -1375,15 +1416,6 @@ def request_too_large(e):
     return 'Request too large (max 8 MB)', 413
 
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# ENTRY POINT
-# ═══════════════════════════════════════════════════════════════════════════════
-
-if __name__ == '__main__':
-    # Production: gunicorn app:app --workers 4 --worker-class gevent --bind 0.0.0.0:$PORT
-    port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
-
 # ═══════════════════════════════════════════════════════════════════════════════
 # ROUTES — MISSING FROM FIRST PASS (all 33 added here)
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1518,11 +1550,15 @@ def widget():
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({
+    resp = jsonify({
         'status':    'healthy',
         'timestamp': datetime.now().isoformat(),
         'version':   '1.0.0',
     })
+    # Lets load balancers and monitors polling in a tight loop share one
+    # response per second instead of each probe hitting the worker.
+    resp.headers['Cache-Control'] = 'public, max-age=1'
+    return resp
 
 
 @app.route('/admin/leads')
@@ -1746,6 +1782,23 @@ def init_db_production():
     </form>'''
 
 
+# ── Upgrade-required pages ────────────────────────────────────────────────────
+# The upgrade templates only vary by plan_type (a handful of values), so each
+# (template, plan) pair is rendered once and the encoded bytes are reused for
+# every later 403 — free-tier page views no longer re-render the same page.
+
+_upgrade_page_cache: dict = {}
+
+
+def _upgrade_page(template: str, plan_type: str) -> Response:
+    key  = (template, plan_type)
+    body = _upgrade_page_cache.get(key)
+    if body is None:
+        body = render_template(template, plan_type=plan_type).encode('utf-8')
+        _upgrade_page_cache[key] = body
+    return Response(body, status=403, mimetype='text/html')
+
+
 # ── Customize ─────────────────────────────────────────────────────────────────
 
 @app.route('/customize')
@@ -1754,12 +1807,9 @@ def customize_page():
     client_id = request.args.get('client_id')
     if not client_id or not models.verify_client_ownership(current_user.id, client_id):
         return 'Unauthorized', 403
-    fresh_user  = models.get_user_by_id(current_user.id)
-    plan_type   = (fresh_user or {}).get('plan_type', current_user.plan_type)
-    plan_limits = PLAN_LIMITS.get(plan_type, PLAN_LIMITS['free'])
+    fresh_user, plan_type, plan_limits = current_plan()
     if not plan_limits['customization']:
-        return render_template('customize_upgrade.html',
-                               user=current_user, plan_type=plan_type), 403
+        return _upgrade_page('customize_upgrade.html', plan_type)
     client = models.get_client_by_id(client_id)
     branding_settings = {}
     if client and client.get('branding_settings'):
@@ -1863,8 +1913,11 @@ def save_customization():
                 'schedule':       incoming_bh.get('schedule', {}),
             }
         else:
-            # Explicitly remove — user turned it off
-            branding_settings.pop('business_hours', None)
+            # Explicitly clear — user turned it off. Stored as null rather
+            # than dropped: the UPDATE below merges top-level keys, so an
+            # absent key would keep the old schedule. check_business_hours
+            # treats null the same as unset.
+            branding_settings['business_hours'] = None
 
         raw_qr = branding_settings['bot_settings'].get('quick_replies') or []
         branding_settings['bot_settings']['quick_replies'] = [
@@ -1881,11 +1934,17 @@ def save_customization():
         remove_branding = False
         branding_settings['branding']['remove_branding'] = remove_branding
 
+        # Top-level jsonb merge done in Postgres: keys this form doesn't own
+        # (written by other features) survive without a Python-side
+        # read-modify-write of the whole blob.
         conn   = models.get_db_connection()
         cursor = conn.cursor()
         cursor.execute(
-            '''UPDATE clients SET branding_settings=%s, company_name=%s,
-               widget_color=%s, welcome_message=%s, remove_branding=%s
+            '''UPDATE clients
+               SET branding_settings = (COALESCE(NULLIF(branding_settings, ''), '{}')::jsonb
+                                        || %s::jsonb)::text,
+                   company_name=%s, widget_color=%s, welcome_message=%s,
+                   remove_branding=%s
                WHERE client_id=%s AND user_id=%s''',
             (
                 json.dumps(branding_settings),
@@ -1898,6 +1957,7 @@ def save_customization():
             )
         )
         conn.commit(); cursor.close(); conn.close()
+        models.invalidate_client_cache(client_id)
         app.logger.info(f'Customization saved for client: {client_id}')
         return jsonify({'success': True, 'message': 'Customization saved successfully'})
     except Exception as e:
@@ -1913,9 +1973,7 @@ def cart_recovery_page():
     client_id = request.args.get('client_id')
     if not client_id or not models.verify_client_ownership(current_user.id, client_id):
         return 'Unauthorized', 403
-    fresh_user  = models.get_user_by_id(current_user.id)
-    plan_type   = (fresh_user or {}).get('plan_type', current_user.plan_type)
-    plan_limits = PLAN_LIMITS.get(plan_type, PLAN_LIMITS['free'])
+    fresh_user, plan_type, plan_limits = current_plan()
     client      = models.get_client_by_id(client_id) or {}
     return render_template(
         'cart_recovery.html',
@@ -2634,9 +2692,7 @@ def connect_woocommerce_manual():
 @app.route('/integrations')
 @login_required
 def integrations_page():
-    fresh_user  = models.get_user_by_id(current_user.id)
-    plan_type   = (fresh_user or {}).get('plan_type', current_user.plan_type)
-    plan_limits = PLAN_LIMITS.get(plan_type, PLAN_LIMITS['free'])
+    fresh_user, plan_type, plan_limits = current_plan()
     if not plan_limits.get('webhooks'):
         return redirect(url_for('auth.dashboard') + '?upgrade=webhooks')
     clients  = models.get_user_clients(current_user.id)
@@ -2847,9 +2903,7 @@ def _action_belongs_to_client(action_id, client_id: str) -> bool:
 @app.route('/agent-actions')
 @login_required
 def agent_actions_page():
-    fresh_user  = models.get_user_by_id(current_user.id)
-    plan_type   = (fresh_user or {}).get('plan_type', current_user.plan_type)
-    plan_limits = PLAN_LIMITS.get(plan_type, PLAN_LIMITS['free'])
+    fresh_user, plan_type, plan_limits = current_plan()
     if not plan_limits.get('agentic_actions'):
         return redirect(url_for('auth.dashboard') + '?upgrade=agentic_actions')
     clients = models.get_user_clients(current_user.id)
@@ -3150,13 +3204,10 @@ def apply_agent_action_template(client_id):
 @app.route('/analytics')
 @login_required
 def analytics_page():
-    fresh_user  = models.get_user_by_id(current_user.id)
-    plan_type   = (fresh_user or {}).get('plan_type', current_user.plan_type)
-    plan_limits = PLAN_LIMITS.get(plan_type, PLAN_LIMITS['free'])
+    fresh_user, plan_type, plan_limits = current_plan()
     is_admin    = bool((fresh_user or {}).get('is_admin', False))
     if not plan_limits['analytics'] and not is_admin:
-        return render_template('analytics_upgrade.html',
-                               user=current_user, plan_type=plan_type), 403
+        return _upgrade_page('analytics_upgrade.html', plan_type)
     clients   = models.get_user_clients(current_user.id)
     client_id = request.args.get('client_id')
     if not client_id and clients:
@@ -3210,16 +3261,31 @@ def thank_you_page():
 @app.route('/api/webhook/lead', methods=['POST'])
 def webhook_new_lead():
     try:
-        import hmac as _hmac
         _wh_secret = os.environ.get('WEBHOOK_SECRET', '').strip()
         if not _wh_secret:
             return jsonify({'error': 'Webhook not configured'}), 503
-        _provided = request.headers.get('X-Webhook-Secret', '')
-        if not _hmac.compare_digest(_provided, _wh_secret):
+        # cache=True so request.json below still sees the body
+        if not verify_webhook_request(request.headers,
+                                      request.get_data(cache=True), _wh_secret):
             return jsonify({'error': 'Unauthorized'}), 401
         data      = request.json or {}
         client_id = data.get('client_id')
-        leads     = (models.get_leads(client_id) or [])[:10]
+        leads     = models.get_leads(client_id, limit=10)
         return jsonify({'success': True, 'leads': leads})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ENTRY POINT
+# ═══════════════════════════════════════════════════════════════════════════════
+# Must stay the last statement in the module: app.run() blocks, so any route
+# defined below it would never be registered under `python app.py`.
+#
+# Production (Procfile): gunicorn app:app --workers 1 --worker-class gevent
+#   --worker-connections 100 --timeout 120 --bind 0.0.0.0:$PORT
+# Local development with reloader + debugger: flask --app app run --debug
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    app.run(debug=False, host='0.0.0.0', port=port)
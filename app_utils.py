@@ -7,7 +7,20 @@ Keep this module free of Flask app-context dependencies (no `app`, no `mail`,
 no `models`) so it can be imported at module load time without side-effects.
 """
 
+import hashlib
+import hmac
 import re
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+# Optional orjson — faster request.get_json()/jsonify. Falls back to
+# Flask's stdlib provider if not installed.
+try:
+    import orjson as _orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 def sanitize_input(text, max_length: int = 500) -> str:
@@ -22,3 +35,84 @@ def sanitize_input(text, max_length: int = 500) -> str:
     text = text[:max_length]
     text = ' '.join(text.split())
     return text.strip()
+
+
+# Shape check for an email address typed into a form or an admin script.
+EMAIL_RE = re.compile(r'^[\w.%+\-]+@[\w.\-]+\.[a-zA-Z]{2,}$')
+
+
+# Replay window for signed inbound webhooks — same 5 minutes most providers
+# (Stripe, Calendly, Slack) use.
+WEBHOOK_TIMESTAMP_TOLERANCE_SEC = 300
+
+
+def verify_webhook_request(headers, raw_body: bytes, secret: str, now: float = None) -> bool:
+    """
+    Authenticate a call to our own /api/webhook/* endpoints.
+
+    Preferred scheme: X-Webhook-Timestamp (unix seconds) plus
+    X-Webhook-Signature: "sha256=" + hex HMAC-SHA256(secret,
+    "<timestamp>." + raw_body). The timestamp is inside the signed payload,
+    so a captured request can't be replayed under a fresh header, and
+    anything outside WEBHOOK_TIMESTAMP_TOLERANCE_SEC is refused.
+
+    Legacy scheme: X-Webhook-Secret carrying the shared secret verbatim —
+    still accepted (constant-time compare) so integrations configured before
+    signing existed keep working. Ignored whenever a signature is present.
+
+    Returns False (never raises) on anything missing or malformed.
+    """
+    if not secret:
+        return False
+    signature = (headers.get('X-Webhook-Signature') or '').strip()
+    if not signature:
+        provided = headers.get('X-Webhook-Secret') or ''
+        return bool(provided) and hmac.compare_digest(provided.encode('utf-8'), secret.encode('utf-8'))
+
+    try:
+        timestamp = int(headers.get('X-Webhook-Timestamp') or '')
+    except ValueError:
+        return False
+    if abs((time.time() if now is None else now) - timestamp) > WEBHOOK_TIMESTAMP_TOLERANCE_SEC:
+        return False
+
+    signed_payload = f'{timestamp}.'.encode('utf-8') + (raw_body or b'')
+    expected = 'sha256=' + hmac.new(
+        secret.encode('utf-8'), signed_payload, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(expected.encode('utf-8'), signature.encode('utf-8'))
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes/decodes with orjson where the output
+    matches the stdlib provider, and defers to it everywhere else.
+
+    Dates and dataclasses are passed through to Flask's own `default`, so
+    datetimes still serialize as HTTP dates rather than orjson's ISO form
+    and existing clients see the same payloads. Anything orjson refuses
+    (ints past 64 bits, unknown types) is retried on the stdlib path, as is
+    any call with json.dumps kwargs other than jsonify's compact/indent.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        indent     = kwargs.pop('indent', None)
+        separators = kwargs.pop('separators', None)
+        if kwargs or indent not in (None, 2) or separators not in (None, (',', ':')):
+            return super().dumps(obj, indent=indent, separators=separators, **kwargs)
+
+        option = (_orjson.OPT_PASSTHROUGH_DATETIME | _orjson.OPT_PASSTHROUGH_DATACLASS
+                  | _orjson.OPT_NON_STR_KEYS)
+        if self.sort_keys:
+            option |= _orjson.OPT_SORT_KEYS
+        if indent:
+            option |= _orjson.OPT_INDENT_2
+        try:
+            return _orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, indent=indent, separators=separators)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return _orjson.loads(s)
@@ -59,6 +59,61 @@ def init_agency(plan_limits):
 
 
 # ── Analytics ────────────────────────────────────────────────────────────────
+# Queries run by get_analytics().
+
+_SQL_CONV_COUNTS = (
+    'SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE matched) AS matched_count '
+    'FROM conversations WHERE client_id = %s AND timestamp >= %s'
+)
+_SQL_LEAD_COUNT = (
+    'SELECT COUNT(*) AS total_leads FROM leads '
+    'WHERE client_id = %s AND created_at >= %s'
+)
+_SQL_CONV_BY_DAY = (
+    'SELECT DATE(timestamp) AS day, COUNT(*) AS daily_count FROM conversations '
+    'WHERE client_id = %s AND timestamp >= %s GROUP BY day'
+)
+_SQL_LEADS_BY_DAY = (
+    'SELECT DATE(created_at) AS day, COUNT(*) AS daily_leads FROM leads '
+    'WHERE client_id = %s AND created_at >= %s GROUP BY day'
+)
+_SQL_TOP_QUESTIONS = (
+    'SELECT user_message, COUNT(*) as count FROM conversations '
+    'WHERE client_id = %s AND timestamp >= %s AND matched = TRUE '
+    'GROUP BY user_message ORDER BY count DESC LIMIT %s'
+)
+_SQL_UNANSWERED_QUESTIONS = (
+    'SELECT user_message, COUNT(*) as count FROM conversations '
+    'WHERE client_id = %s AND timestamp >= %s AND matched = FALSE '
+    'GROUP BY user_message ORDER BY count DESC LIMIT %s'
+)
+_SQL_RECENT_LEADS = (
+    'SELECT name, email, phone, created_at FROM leads '
+    'WHERE client_id = %s ORDER BY created_at DESC LIMIT 15'
+)
+_SQL_TRANSCRIPT_TURNS = '''
+    SELECT session_id, user_message, bot_response, matched, timestamp
+    FROM conversations
+    WHERE client_id = %s
+      AND (method IS NULL OR method != 'lead_captured')
+    ORDER BY timestamp DESC
+    LIMIT 2000
+'''
+_SQL_CSAT = '''
+    SELECT
+      COUNT(*) FILTER (WHERE csat_rating = 1)  AS positive,
+      COUNT(*) FILTER (WHERE csat_rating = -1) AS negative,
+      COUNT(*) FILTER (WHERE csat_rating IS NOT NULL) AS total_rated
+    FROM chat_sessions
+    WHERE client_id = %s AND created_at >= %s
+'''
+_SQL_PEAK_HOURS = '''
+    SELECT EXTRACT(HOUR FROM timestamp)::int AS hour, COUNT(*) AS cnt
+    FROM conversations
+    WHERE client_id = %s AND timestamp >= %s
+    GROUP BY hour ORDER BY hour
+'''
+
 
 @agency_bp.route('/api/admin/analytics', methods=['GET'])
 @login_required
@@ -102,75 +157,51 @@ def get_analytics():
 
         conn, cursor = models.get_db()
 
-        cursor.execute(
-            'SELECT COUNT(*) AS total FROM conversations '
-            'WHERE client_id = %s AND timestamp >= %s',
-            (client_id, start_date)
-        )
-        total_conversations = (cursor.fetchone() or {}).get('total', 0)
-
-        cursor.execute(
-            'SELECT COUNT(*) AS matched_count FROM conversations '
-            'WHERE client_id = %s AND timestamp >= %s AND matched = TRUE',
-            (client_id, start_date)
-        )
-        answered         = (cursor.fetchone() or {}).get('matched_count', 0)
+        # Total and answered in one range scan rather than two COUNT queries.
+        cursor.execute(_SQL_CONV_COUNTS, (client_id, start_date))
+        counts_row          = cursor.fetchone() or {}
+        total_conversations = counts_row.get('total', 0)
+        answered            = counts_row.get('matched_count', 0)
         unanswered_count = total_conversations - answered
         answer_rate      = (int(answered / total_conversations * 100)
                             if total_conversations > 0 else 0)
 
-        cursor.execute(
-            'SELECT COUNT(*) AS total_leads FROM leads '
-            'WHERE client_id = %s AND created_at >= %s',
-            (client_id, start_date)
-        )
+        cursor.execute(_SQL_LEAD_COUNT, (client_id, start_date))
         total_leads = (cursor.fetchone() or {}).get('total_leads', 0)
 
-        timeline      = []
+        # ── Timeline — one GROUP BY per table instead of 2 queries per day ──
+        # (the old per-day loop was 2 × days_to_show round-trips — up to 730
+        # on a 365-day advanced window). Days with no rows are gap-filled
+        # from the Python-generated date range below.
         days_to_show  = max(1, min(window_days or 30, max_days))
-        for i in range(days_to_show):
-            date     = (now - timedelta(days=(days_to_show - 1) - i))
-            date_str = date.strftime('%Y-%m-%d')
-            cursor.execute(
-                'SELECT COUNT(*) AS daily_count FROM conversations '
-                'WHERE client_id = %s AND DATE(timestamp) = %s',
-                (client_id, date_str)
-            )
-            conv_count = (cursor.fetchone() or {}).get('daily_count', 0)
-            cursor.execute(
-                'SELECT COUNT(*) AS daily_leads FROM leads '
-                'WHERE client_id = %s AND DATE(created_at) = %s',
-                (client_id, date_str)
-            )
-            lead_count = (cursor.fetchone() or {}).get('daily_leads', 0)
-            timeline.append({'date': date_str, 'count': conv_count, 'leads': lead_count})
+        timeline_days = [
+            (now - timedelta(days=(days_to_show - 1) - i)).strftime('%Y-%m-%d')
+            for i in range(days_to_show)
+        ]
+        timeline_start = (now - timedelta(days=days_to_show - 1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        cursor.execute(_SQL_CONV_BY_DAY, (client_id, timeline_start))
+        conv_by_day = {r['day'].isoformat(): r['daily_count'] for r in cursor.fetchall()}
+        cursor.execute(_SQL_LEADS_BY_DAY, (client_id, timeline_start))
+        leads_by_day = {r['day'].isoformat(): r['daily_leads'] for r in cursor.fetchall()}
+        timeline = [
+            {'date': d, 'count': conv_by_day.get(d, 0), 'leads': leads_by_day.get(d, 0)}
+            for d in timeline_days
+        ]
 
         # ── Top / unanswered questions — tiered limit ────────────────────
         top_limit = 500 if is_advanced else 5   # "unlimited" capped at a sane payload size
 
-        cursor.execute(
-            'SELECT user_message, COUNT(*) as count FROM conversations '
-            'WHERE client_id = %s AND timestamp >= %s AND matched = TRUE '
-            'GROUP BY user_message ORDER BY count DESC LIMIT %s',
-            (client_id, start_date, top_limit)
-        )
+        cursor.execute(_SQL_TOP_QUESTIONS, (client_id, start_date, top_limit))
         top_questions = [{'question': r['user_message'], 'count': r['count']}
                          for r in cursor.fetchall()]
 
-        cursor.execute(
-            'SELECT user_message, COUNT(*) as count FROM conversations '
-            'WHERE client_id = %s AND timestamp >= %s AND matched = FALSE '
-            'GROUP BY user_message ORDER BY count DESC LIMIT %s',
-            (client_id, start_date, top_limit)
-        )
+        cursor.execute(_SQL_UNANSWERED_QUESTIONS, (client_id, start_date, top_limit))
         unanswered_list = [{'question': r['user_message'], 'count': r['count']}
                            for r in cursor.fetchall()]
 
-        cursor.execute(
-            'SELECT name, email, phone, created_at FROM leads '
-            'WHERE client_id = %s ORDER BY created_at DESC LIMIT 15',
-            (client_id,)
-        )
+        cursor.execute(_SQL_RECENT_LEADS, (client_id,))
         leads_captured = [
             {
                 'name':       r['name'],
@@ -183,27 +214,20 @@ def get_analytics():
 
         # ── Conversation transcripts — tiered by session count ────────────
         transcript_session_limit = 10 if not is_advanced else 500
-        cursor.execute(
-            '''SELECT session_id, user_message, bot_response, matched, timestamp
-               FROM conversations
-               WHERE client_id = %s
-                 AND (method IS NULL OR method != 'lead_captured')
-               ORDER BY timestamp DESC
-               LIMIT 2000''',
-            (client_id,)
-        )
+        cursor.execute(_SQL_TRANSCRIPT_TURNS, (client_id,))
         raw_turns = cursor.fetchall()
         sessions_order = []
         sessions_map   = {}
         for r in raw_turns:
-            sid = r.get('session_id') or f"turn-{r['timestamp'].isoformat() if r.get('timestamp') else len(sessions_order)}"
+            ts_iso = r['timestamp'].isoformat() if r.get('timestamp') else ''
+            sid = r.get('session_id') or f"turn-{ts_iso or len(sessions_order)}"
             if sid not in sessions_map:
                 if len(sessions_order) >= transcript_session_limit:
                     continue
                 sessions_order.append(sid)
                 sessions_map[sid] = {
                     'session_id': sid,
-                    'started_at': r['timestamp'].isoformat() if r.get('timestamp') else '',
+                    'started_at': ts_iso,
                     'messages':   [],
                 }
             if sid in sessions_map:
@@ -211,7 +235,7 @@ def get_analytics():
                     'user_message': r.get('user_message') or '',
                     'bot_response': r.get('bot_response') or '',
                     'matched':      bool(r.get('matched')),
-                    'timestamp':    r['timestamp'].isoformat() if r.get('timestamp') else '',
+                    'timestamp':    ts_iso,
                 })
         transcripts = [sessions_map[sid] for sid in sessions_order]
         for t in transcripts:
@@ -233,15 +257,7 @@ def get_analytics():
         # ── Advanced-only: customer satisfaction (real CSAT data) ─────────
         # ── Advanced-only: peak conversation times ────────────────────────
         if is_advanced:
-            cursor.execute(
-                '''SELECT
-                     COUNT(*) FILTER (WHERE csat_rating = 1)  AS positive,
-                     COUNT(*) FILTER (WHERE csat_rating = -1) AS negative,
-                     COUNT(*) FILTER (WHERE csat_rating IS NOT NULL) AS total_rated
-                   FROM chat_sessions
-                   WHERE client_id = %s AND created_at >= %s''',
-                (client_id, start_date)
-            )
+            cursor.execute(_SQL_CSAT, (client_id, start_date))
             csat_row  = cursor.fetchone() or {}
             positive  = int(csat_row.get('positive') or 0)
             negative  = int(csat_row.get('negative') or 0)
@@ -253,13 +269,7 @@ def get_analytics():
                 'satisfaction_rate': (round(100 * positive / total_rated) if total_rated else None),
             }
 
-            cursor.execute(
-                '''SELECT EXTRACT(HOUR FROM timestamp)::int AS hour, COUNT(*) AS cnt
-                   FROM conversations
-                   WHERE client_id = %s AND timestamp >= %s
-                   GROUP BY hour ORDER BY hour''',
-                (client_id, start_date)
-            )
+            cursor.execute(_SQL_PEAK_HOURS, (client_id, start_date))
             hour_counts = {int(r['hour']): int(r['cnt']) for r in cursor.fetchall()}
             result['peak_times'] = [
                 {'hour': h, 'count': hour_counts.get(h, 0)} for h in range(24)
@@ -271,7 +281,7 @@ def get_analytics():
         return jsonify({'success': True, 'analytics': result})
 
     except Exception as e:
-        current_app.logger.error(f'Error getting analytics: {e}')
+        current_app.logger.exception(f'Error getting analytics: {e}')
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -28,15 +28,19 @@ Routes
 
 Registration in app.py:
   from blueprints.billing import billing_bp, init_billing, PLAN_PRICES_FLW
-  init_billing(mail=mail, get_subscription_status=get_subscription_status)
+  init_billing(mail=mail, get_subscription_status=get_subscription_status,
+               executor=_billing_executor)
   app.register_blueprint(billing_bp)
 """
 
 import base64
+import hmac
 import os
 import time
+from functools import lru_cache
 
 import requests as _requests
+from requests.adapters import HTTPAdapter
 from flask import (Blueprint, flash, jsonify, redirect,
                    render_template, request, current_app, url_for)
 from flask_login import current_user, login_required
@@ -52,16 +56,27 @@ billing_bp = Blueprint('billing', __name__)
 # Injected dependencies — populated by init_billing() before first request.
 _mail                   = None
 _get_subscription_status = None
+_executor               = None
 
 
-def init_billing(mail, get_subscription_status):
+def init_billing(mail, get_subscription_status, executor):
     """
     Called once in app.py after all shared objects are ready.
     Must be called before the first request reaches this blueprint.
     """
-    global _mail, _get_subscription_status
+    global _mail, _get_subscription_status, _executor
     _mail                    = mail
     _get_subscription_status = get_subscription_status
+    _executor                = executor
+
+
+# ── Payment-provider HTTP session ─────────────────────────────────────────────
+# One keep-alive pool for every Flutterwave/PayPal API call, so the verify
+# retries and the cancel flow's token + cancel pair reuse a TLS connection
+# instead of handshaking per call.
+
+_provider_http = _requests.Session()
+_provider_http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
 
 
 # ── Pricing table ─────────────────────────────────────────────────────────────
@@ -97,52 +112,59 @@ PLAN_PRICES_FLW = {
 }
 
 
+# ── Flutterwave Payment Plan IDs ──────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def _parse_plan_ids(env_var_name):
+    """Parse 'ai_starter:<id>,ai_growth:<id>,ai_scale:<id>' into
+    {'ai_starter': '<id>', ...} with env validation logging.
+    Memoized per env var: the env is fixed for the life of the process, so
+    /upgrade parses (and logs the validation result) once per worker rather
+    than on every page view. Don't mutate the returned dict.
+    Only the 3 new self-serve tiers get recurring Payment Plan IDs here —
+    grandfathered solo/starter/pro/growth subscribers keep whatever plan
+    ID they were already on; this route no longer sells to them."""
+    raw = os.environ.get(env_var_name, '')
+    if not raw:
+        current_app.logger.error(
+            f"[Billing] ENV VAR MISSING: {env_var_name} is not set — "
+            f"/upgrade will fail to render"
+        )
+        return {}
+    result = {}
+    plans = ['ai_starter', 'ai_growth', 'ai_scale']
+    for pair in raw.split(','):
+        pair = pair.strip()
+        if ':' not in pair:
+            current_app.logger.warning(
+                f"[Billing] {env_var_name}: malformed entry '{pair}' (expected plan:id)"
+            )
+            continue
+        plan, plan_id = pair.split(':', 1)
+        plan = plan.strip().lower()
+        if plan not in plans:
+            current_app.logger.warning(
+                f"[Billing] {env_var_name}: unknown plan '{plan}' in entry '{pair}'"
+            )
+        else:
+            result[plan] = plan_id.strip()
+    missing = [p for p in plans if p not in result]
+    if missing:
+        current_app.logger.error(
+            f"[Billing] {env_var_name}: missing plan IDs for: {missing}"
+        )
+    else:
+        current_app.logger.info(
+            f"[Billing] {env_var_name}: all {len(plans)} plan IDs present — {list(result.keys())}"
+        )
+    return result
+
+
 # ── Routes ───────────────────────────────────────────────────────────────────
 
 @billing_bp.route('/upgrade')
 @login_required
 def upgrade_page():
-    def _parse_plan_ids(env_var_name):
-        """Parse 'ai_starter:<id>,ai_growth:<id>,ai_scale:<id>' into
-        {'ai_starter': '<id>', ...} with env validation logging.
-        Only the 3 new self-serve tiers get recurring Payment Plan IDs here —
-        grandfathered solo/starter/pro/growth subscribers keep whatever plan
-        ID they were already on; this route no longer sells to them."""
-        raw = os.environ.get(env_var_name, '')
-        if not raw:
-            current_app.logger.error(
-                f"[Billing] ENV VAR MISSING: {env_var_name} is not set — "
-                f"/upgrade will fail to render"
-            )
-            return {}
-        result = {}
-        plans = ['ai_starter', 'ai_growth', 'ai_scale']
-        for pair in raw.split(','):
-            pair = pair.strip()
-            if ':' not in pair:
-                current_app.logger.warning(
-                    f"[Billing] {env_var_name}: malformed entry '{pair}' (expected plan:id)"
-                )
-                continue
-            plan, plan_id = pair.split(':', 1)
-            plan = plan.strip().lower()
-            if plan not in plans:
-                current_app.logger.warning(
-                    f"[Billing] {env_var_name}: unknown plan '{plan}' in entry '{pair}'"
-                )
-            else:
-                result[plan] = plan_id.strip()
-        missing = [p for p in plans if p not in result]
-        if missing:
-            current_app.logger.error(
-                f"[Billing] {env_var_name}: missing plan IDs for: {missing}"
-            )
-        else:
-            current_app.logger.info(
-                f"[Billing] {env_var_name}: all {len(plans)} plan IDs present — {list(result.keys())}"
-            )
-        return result
-
     return render_template(
         'upgrade-shopify.html',
         user=current_user,
@@ -199,7 +221,7 @@ def flutterwave_callback():
 
     for attempt in range(3):
         try:
-            resp = _requests.get(verify_url, headers=headers, timeout=15)
+            resp = _provider_http.get(verify_url, headers=headers, timeout=15)
             resp.raise_for_status()
             flw_data = resp.json()
             break
@@ -277,7 +299,7 @@ def flutterwave_callback():
             flash("This payment has already been processed.", 'info')
             return redirect(url_for('auth.dashboard'))  # FW-010 fix
     except Exception as e:
-        current_app.logger.error(f"Flutterwave duplicate check failed: {e}")
+        current_app.logger.exception(f"Flutterwave duplicate check failed: {e}")
         # Continue — don't block the user
 
     models.update_user_subscription(
@@ -332,7 +354,9 @@ def flutterwave_webhook():
     flw_hash     = os.environ.get('FLW_WEBHOOK_HASH', '')
     request_hash = request.headers.get('verif-hash', '')
 
-    if not flw_hash or request_hash != flw_hash:
+    # Constant-time compare — a plain != leaks how many leading characters
+    # of the secret hash a forged request got right.
+    if not flw_hash or not hmac.compare_digest(request_hash.encode(), flw_hash.encode()):
         current_app.logger.warning(
             f"Flutterwave webhook: invalid hash (got '{request_hash[:20]}...')"
         )
@@ -417,6 +441,25 @@ def flutterwave_webhook():
         )
         return jsonify({'status': 'amount mismatch'}), 200
 
+    # Without a txn id there's nothing to dedupe or record the payment
+    # against — every such delivery would share one key and one reference.
+    if not txn_id:
+        current_app.logger.error(
+            f"Flutterwave webhook: missing transaction id for user={user_id} "
+            f"tx_ref='{tx_ref}'"
+        )
+        return jsonify({'status': 'missing transaction id'}), 200
+
+    # Delivery dedupe: Flutterwave retries until it sees a 200, and two
+    # overlapping retries can both pass the payments SELECT below before
+    # either records. Claiming the txn id is a single atomic INSERT.
+    idem_key = f'flw:{txn_id}'
+    if not models.claim_idempotency_key(idem_key):
+        current_app.logger.info(
+            f"Flutterwave webhook: duplicate delivery for txn {txn_id}"
+        )
+        return jsonify({'status': 'already processed'}), 200
+
     # FW-006: Duplicate check before recording payment
     try:
         conn, cursor = models.get_db()
@@ -433,26 +476,35 @@ def flutterwave_webhook():
             )
             return jsonify({'status': 'already processed'}), 200
     except Exception as e:
-        current_app.logger.error(
+        current_app.logger.exception(
             f"Flutterwave webhook duplicate check failed: {e}"
         )
+        models.release_idempotency_key(idem_key)
         return jsonify({'status': 'db error'}), 200
 
-    models.update_user_subscription(
-        user_id=user_id,
-        plan_type=plan,
-        billing_provider='flutterwave',
-        subscription_id=txn_id,
-        is_annual=is_annual
-    )
-    models.record_payment(
-        user_id, amount, plan,
-        provider='flutterwave',
-        reference=txn_id,
-        notes=f"{'Annual' if is_annual else 'Monthly'} webhook",
-        payment_date=txn_created_at
-    )
-    models.track_event(
+    try:
+        models.update_user_subscription(
+            user_id=user_id,
+            plan_type=plan,
+            billing_provider='flutterwave',
+            subscription_id=txn_id,
+            is_annual=is_annual
+        )
+        models.record_payment(
+            user_id, amount, plan,
+            provider='flutterwave',
+            reference=txn_id,
+            notes=f"{'Annual' if is_annual else 'Monthly'} webhook",
+            payment_date=txn_created_at
+        )
+    except Exception:
+        models.release_idempotency_key(idem_key)   # let Flutterwave's retry through
+        raise
+    # The subscription and payment writes above stay on the request so a
+    # failure still surfaces to Flutterwave as a retry; the analytics row
+    # is best-effort and doesn't need to hold the ack.
+    _executor.submit(
+        models.track_event,
         'plan_upgrade', user_id=user_id,
         metadata={
             'plan': plan, 'provider': 'flutterwave_webhook',
@@ -478,6 +530,85 @@ def flutterwave_webhook():
 # =====================================================================
 
 
+def _cancel_with_provider(user_id, provider, subscription_id) -> bool:
+    """
+    Stop future charges at Flutterwave/PayPal. Runs on the request so the
+    user learns if it failed — the local cancel alone doesn't stop the
+    provider billing them. Returns True when the provider confirmed the
+    cancel; failures are logged and return False, never raised.
+    """
+    if provider == 'flutterwave':
+        try:
+            flw_secret = os.environ.get('FLW_SECRET_KEY')
+            if not flw_secret:
+                current_app.logger.warning(
+                    "Flutterwave cancel skipped: FLW_SECRET_KEY not set"
+                )
+                return False
+            resp = _provider_http.put(
+                f"https://api.flutterwave.com/v3/subscriptions"
+                f"/{subscription_id}/cancel",
+                headers={"Authorization": f"Bearer {flw_secret}"},
+                timeout=10
+            )
+            resp.raise_for_status()
+            return True
+        except Exception as _e:
+            current_app.logger.warning(f"Flutterwave cancel API call failed: {_e}")
+            return False
+
+    elif provider == 'paypal':
+        try:
+            paypal_client_id     = os.environ.get('PAYPAL_CLIENT_ID', '')
+            paypal_client_secret = os.environ.get('PAYPAL_CLIENT_SECRET', '')
+            paypal_mode          = os.environ.get('PAYPAL_MODE', 'sandbox')
+            paypal_base = (
+                'https://api-m.paypal.com' if paypal_mode == 'live'
+                else 'https://api-m.sandbox.paypal.com'
+            )
+
+            credentials = base64.b64encode(
+                f"{paypal_client_id}:{paypal_client_secret}".encode()
+            ).decode()
+            token_resp = _provider_http.post(
+                f"{paypal_base}/v1/oauth2/token",
+                headers={
+                    "Authorization": f"Basic {credentials}",
+                    "Content-Type":  "application/x-www-form-urlencoded",
+                },
+                data="grant_type=client_credentials",
+                timeout=10
+            )
+            access_token = token_resp.json().get('access_token')
+            if not access_token:
+                current_app.logger.warning(
+                    f"PayPal cancel failed: no access token "
+                    f"(HTTP {token_resp.status_code})"
+                )
+                return False
+
+            resp = _provider_http.post(
+                f"{paypal_base}/v1/billing/subscriptions"
+                f"/{subscription_id}/cancel",
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "Content-Type":  "application/json",
+                },
+                json={"reason": "Cancelled by user via Lumvi dashboard"},
+                timeout=10
+            )
+            resp.raise_for_status()
+            current_app.logger.info(
+                f"[Cancel] PayPal subscription cancelled for user {user_id}"
+            )
+            return True
+        except Exception as _e:
+            current_app.logger.warning(f"PayPal cancel API call failed: {_e}")
+            return False
+
+    return True
+
+
 @billing_bp.route('/subscription/cancel', methods=['GET', 'POST'])
 @login_required
 def cancel_subscription():
@@ -488,75 +619,23 @@ def cancel_subscription():
         if success:
             user = models.get_user_by_id(current_user.id)
 
-            # Notify Flutterwave to stop future charges
+            # Tell the provider to stop future charges
+            provider_ok = True
             if (user and user.get('subscription_id')
-                    and user.get('billing_provider') == 'flutterwave'):
-                try:
-                    flw_secret = os.environ.get('FLW_SECRET_KEY')
-                    if flw_secret:
-                        cancel_url = (
-                            f"https://api.flutterwave.com/v3/subscriptions"
-                            f"/{user['subscription_id']}/cancel"
-                        )
-                        _requests.put(
-                            cancel_url,
-                            headers={"Authorization": f"Bearer {flw_secret}"},
-                            timeout=10
-                        )
-                except Exception as _e:
-                    current_app.logger.warning(
-                        f"Flutterwave cancel API call failed: {_e}"
-                    )
-
-            # Notify PayPal to stop future charges
-            elif (user and user.get('subscription_id')
-                      and user.get('billing_provider') == 'paypal'):
-                try:
-                    paypal_client_id     = os.environ.get('PAYPAL_CLIENT_ID', '')
-                    paypal_client_secret = os.environ.get('PAYPAL_CLIENT_SECRET', '')
-                    paypal_mode          = os.environ.get('PAYPAL_MODE', 'sandbox')
-                    paypal_base = (
-                        'https://api-m.paypal.com' if paypal_mode == 'live'
-                        else 'https://api-m.sandbox.paypal.com'
-                    )
-
-                    credentials = base64.b64encode(
-                        f"{paypal_client_id}:{paypal_client_secret}".encode()
-                    ).decode()
-                    token_resp = _requests.post(
-                        f"{paypal_base}/v1/oauth2/token",
-                        headers={
-                            "Authorization": f"Basic {credentials}",
-                            "Content-Type":  "application/x-www-form-urlencoded",
-                        },
-                        data="grant_type=client_credentials",
-                        timeout=10
-                    )
-                    access_token = token_resp.json().get('access_token')
-
-                    if access_token:
-                        _requests.post(
-                            f"{paypal_base}/v1/billing/subscriptions"
-                            f"/{user['subscription_id']}/cancel",
-                            headers={
-                                "Authorization": f"Bearer {access_token}",
-                                "Content-Type":  "application/json",
-                            },
-                            json={"reason": "Cancelled by user via Lumvi dashboard"},
-                            timeout=10
-                        )
-                        current_app.logger.info(
-                            f"[Cancel] PayPal subscription cancelled "
-                            f"for user {current_user.id}"
-                        )
-                except Exception as _e:
-                    current_app.logger.warning(
-                        f"PayPal cancel API call failed: {_e}"
-                    )
+                    and user.get('billing_provider') in ('flutterwave', 'paypal')):
+                provider_ok = _cancel_with_provider(
+                    current_user.id,
+                    user['billing_provider'],
+                    user['subscription_id'],
+                )
 
-            models.track_event('subscription_cancelled', user_id=current_user.id,
-                               ip_address=get_client_ip(),
-                               user_agent=request.headers.get('User-Agent', ''))
+            # Analytics row is best-effort — keep it off the response.
+            _executor.submit(
+                models.track_event,
+                'subscription_cancelled', user_id=current_user.id,
+                ip_address=get_client_ip(),
+                user_agent=request.headers.get('User-Agent', '')
+            )
 
             # Send cancellation confirmation email
             try:
@@ -602,11 +681,19 @@ def cancel_subscription():
                     f"[Cancel] confirmation email failed: {_mail_err}"
                 )
 
-            flash(
-                "Your subscription has been cancelled. You will retain access "
-                "until the end of your current billing period.",
-                'success'
-            )
+            if provider_ok:
+                flash(
+                    "Your subscription has been cancelled. You will retain access "
+                    "until the end of your current billing period.",
+                    'success'
+                )
+            else:
+                flash(
+                    "Your subscription has been cancelled here, but we couldn't "
+                    "confirm the cancellation with your payment provider. Please "
+                    "contact support@lumvi.net so no further charges are made.",
+                    'error'
+                )
             return redirect(url_for('auth.dashboard'))
         else:
             flash(
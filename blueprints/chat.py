@@ -7,7 +7,7 @@ This is the hottest code path in Lumvi — every widget message flows through he
 All behaviour is identical to the original; nothing has been changed except:
   - Route registration: Blueprint vs app
   - app.logger → current_app.logger
-  - Inline `import traceback` promoted to module level
+  - traceback.print_exc() → current_app.logger.exception()
   - `_notify_handoff` renamed `notify_handoff` (public, from blueprints.inbox)
   - Rate limits applied after registration via init_chat() — same pattern as leads
   - All dependencies injected at registration time via init_chat()
@@ -38,7 +38,9 @@ Registration in app.py:
 """
 
 import json
-import traceback
+import threading
+import time
+from collections import OrderedDict
 
 from flask import Blueprint, jsonify, request, current_app
 
@@ -110,6 +112,38 @@ def init_chat(limiter, ai_helper, plan_limits, vertical_prompts,
     _log_conversation = _log_conversation_and_track_first
 
 
+# get_faqs returns every FAQ with its embedding decoded — the heaviest read
+# on the chat path, and it only changes when the KB does. Cached per
+# client, tagged with the client's kb_version so a save/upload/delete that
+# bumps it is picked up on the next message; the TTL bounds anything that
+# writes faqs without bumping (e.g. background re-embeds). Decoded
+# embeddings are large, so the cache is an LRU capped at
+# _FAQS_CACHE_MAX_CLIENTS, and expired entries are dropped on every write.
+_faqs_cache: OrderedDict = OrderedDict()
+_faqs_cache_lock = threading.Lock()
+_FAQS_CACHE_TTL_SECONDS = 30
+_FAQS_CACHE_MAX_CLIENTS = 64
+
+
+def _get_faqs_cached(client_id):
+    version = cache_utils.get_kb_version(client_id)
+    now = time.time()
+    with _faqs_cache_lock:
+        cached = _faqs_cache.get(client_id)
+        if cached and cached[0] == version and cached[2] > now:
+            _faqs_cache.move_to_end(client_id)
+            return list(cached[1])
+    faqs = models.get_faqs(client_id)
+    with _faqs_cache_lock:
+        for key in [k for k, v in _faqs_cache.items() if v[2] <= now]:
+            del _faqs_cache[key]
+        _faqs_cache[client_id] = (version, faqs, now + _FAQS_CACHE_TTL_SECONDS)
+        _faqs_cache.move_to_end(client_id)
+        while len(_faqs_cache) > _FAQS_CACHE_MAX_CLIENTS:
+            _faqs_cache.popitem(last=False)
+    return list(faqs)
+
+
 # ── Routes ───────────────────────────────────────────────────────────────────
 
 @chat_bp.route('/api/chat', methods=['POST'])
@@ -129,7 +163,7 @@ def chat():
 
         client = None  # always defined — stays None if DB call below fails
         try:
-            client = models.get_client_by_id(client_id)
+            client = models.get_client_by_id_cached(client_id)
             if not client:
                 current_app.logger.warning(
                     f'Client not found: {client_id}, using demo FAQs'
@@ -158,7 +192,7 @@ def chat():
             else:
                 config    = (json.loads(client['branding_settings'])
                              if client['branding_settings'] else {})
-                faqs_list = models.get_faqs(client_id)
+                faqs_list = _get_faqs_cached(client_id)
         except Exception as db_error:
             current_app.logger.error(f'Database error: {db_error}')
             faqs_list = []
@@ -654,8 +688,7 @@ def chat():
         })
 
     except Exception as e:
-        current_app.logger.error(f'Error in chat endpoint: {e}')
-        traceback.print_exc()
+        current_app.logger.exception(f'Error in chat endpoint: {e}')
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
 
@@ -19,6 +19,7 @@ from flask import Blueprint, jsonify, request
 from flask_login import current_user, login_required
 
 import models
+from app_utils import EMAIL_RE
 from models.db import get_db
 from utils import get_logger
 
@@ -35,7 +36,6 @@ _CART_RECOVERY_PLANS = {'ai_growth', 'ai_scale'}
 
 # ── Validation helpers ────────────────────────────────────────────────────────
 
-_EMAIL_RE  = re.compile(r'^[\w.%+\-]+@[\w.\-]+\.[a-zA-Z]{2,}$')
 _PHONE_RE  = re.compile(r'^[+\d][\d\s\-().]{6,19}$')
 _HTTPS_RE  = re.compile(r'^https://.{4,}')
 
@@ -75,7 +75,7 @@ def _validate_field(name: str, value: str):
         return v, None   # clearing a field is always allowed
 
     if name == 'notification_email':
-        if not _EMAIL_RE.match(v):
+        if not EMAIL_RE.match(v):
             return None, 'Invalid email address'
         return v.lower(), None
 
@@ -233,6 +233,7 @@ def _write_client_columns(client_id: str, fields: dict) -> bool:
             values,
         )
         conn.commit()
+        models.invalidate_client_cache(client_id)
         return True
     except Exception as e:
         if conn:
@@ -266,10 +266,11 @@ def send_stale_lead_nudges():
     )
     notified = skipped = errors = 0
     base_url = os.environ.get('APP_BASE_URL', 'https://lumvi.net')
+    clients  = models.get_clients_by_ids(l['client_id'] for l in stale_leads)
 
     for lead in stale_leads:
         cid = lead['client_id']
-        client = models.get_client_by_id(cid)
+        client = clients.get(cid)
         if not client:
             skipped += 1
             continue
@@ -357,10 +358,11 @@ def send_followup_reminders():
     due_leads = models.get_due_follow_ups()
     notified = skipped = errors = 0
     base_url = os.environ.get('APP_BASE_URL', 'https://lumvi.net')
+    clients  = models.get_clients_by_ids(l['client_id'] for l in due_leads)
 
     for lead in due_leads:
         cid = lead['client_id']
-        client = models.get_client_by_id(cid)
+        client = clients.get(cid)
         if not client:
             skipped += 1
             continue
@@ -901,7 +903,8 @@ def cron_weekly_digest():
 @cron_bp.route('/cron/cleanup-logs', methods=['GET', 'POST'])
 def cron_cleanup_logs():
     """
-    Prune old webhook_logs (default >60 days) to keep the DB lean.
+    Prune old webhook_logs (default >60 days) and week-old inbound
+    idempotency_keys to keep the DB lean.
     Conversations are NEVER pruned — preserved for LLM fine-tuning.
 
     Recommended schedule: weekly (e.g. every Sunday at 03:00 UTC).
@@ -32,27 +32,31 @@ Registration in app.py:
       plan_limits=PLAN_LIMITS,
       ai_helper=ai_helper,
       extract_keywords=extract_keywords,
+      current_plan=current_plan,
   )
   app.register_blueprint(faqs_bp)
 """
 
-import hmac
 import html as _html
 import io
 import json
 import os
 import re
 import threading
-import traceback
 import urllib.error
 import urllib.request
 import uuid
+from itertools import repeat
 
+import pandas as pd
+import PyPDF2
 from flask import Blueprint, jsonify, redirect, render_template, request, current_app, url_for
 from flask_login import current_user, login_required
+from psycopg2.extras import execute_values
 
 import cache_utils
 import models
+from app_utils import verify_webhook_request
 
 # ── Blueprint ────────────────────────────────────────────────────────────────
 
@@ -63,42 +67,57 @@ _app              = None   # needed only to push context in background thread
 _plan_limits      = None
 _ai_helper        = None
 _extract_keywords = None
+_current_plan     = None
 
 
-def init_faqs(app, plan_limits, ai_helper, extract_keywords):
+def init_faqs(app, plan_limits, ai_helper, extract_keywords, current_plan):
     """
     Called once in app.py after all shared objects are ready.
     Must be called before the first request reaches this blueprint.
     """
-    global _app, _plan_limits, _ai_helper, _extract_keywords
+    global _app, _plan_limits, _ai_helper, _extract_keywords, _current_plan
     _app              = app
     _plan_limits      = plan_limits
     _ai_helper        = ai_helper
     _extract_keywords = extract_keywords
+    _current_plan     = current_plan
 
 
 # ── Background helpers ───────────────────────────────────────────────────────
 
 def _save_legacy_faqs(client_id: str, chunks: list):
-    """Insert enriched chunks into the legacy faqs table (backward compat)."""
+    """Insert enriched chunks into the legacy faqs table (backward compat).
+
+    Rows are built up front and sent with a single execute_values() call —
+    one round-trip and one commit regardless of how many chunks a large
+    upload produced, instead of one INSERT per chunk.
+    """
+    rows = [
+        (
+            client_id, str(uuid.uuid4()),
+            chunk['title'],
+            chunk['content'],
+            chunk.get('category', 'General'),
+            json.dumps(chunk.get('tags', [])),
+        )
+        for chunk in chunks
+        if chunk.get('title') and chunk.get('content')
+    ]
+    if not rows:
+        return 0
+
     conn, cursor = models.get_db()
     saved = 0
     try:
-        for chunk in chunks:
-            faq_id = str(uuid.uuid4())
-            cursor.execute(
-                '''INSERT INTO faqs (client_id, faq_id, question, answer, category, triggers)
-                   VALUES (%s, %s, %s, %s, %s, %s)''',
-                (
-                    client_id, faq_id,
-                    chunk['title'],
-                    chunk['content'],
-                    chunk.get('category', 'General'),
-                    json.dumps(chunk.get('tags', []))
-                )
-            )
-            saved += 1
+        execute_values(
+            cursor,
+            '''INSERT INTO faqs (client_id, faq_id, question, answer, category, triggers)
+               VALUES %s''',
+            rows,
+            page_size=500,
+        )
         conn.commit()
+        saved = len(rows)
     except Exception as _e:
         current_app.logger.warning(
             f"[Upload/BG] Legacy FAQ save error (non-critical): {_e}"
@@ -236,17 +255,28 @@ def _dataframe_to_faqs(df):
     if not q_col or not a_col:
         return [], False
 
-    faqs = []
-    for _, row in df.iterrows():
-        question = str(row[q_col]).strip()
-        answer   = str(row[a_col]).strip()
-        if question and answer and question.lower() != 'nan' and answer.lower() != 'nan':
-            faqs.append({
-                'question': question,
-                'answer':   answer,
-                'category': str(row.get('category', 'General')).strip(),
-                'triggers': _extract_keywords(question),
-            })
+    # Column-wise .str ops rather than df.iterrows() — iterrows boxes every
+    # row into a Series, which dominated parse time on large sheets.
+    questions = df[q_col].fillna('').astype(str).str.strip()
+    answers   = df[a_col].fillna('').astype(str).str.strip()
+    keep = (
+        (questions != '') & (answers != '')
+        & (questions.str.lower() != 'nan') & (answers.str.lower() != 'nan')
+    )
+    if 'category' in df.columns:
+        categories = df.loc[keep, 'category'].fillna('General').astype(str).str.strip()
+    else:
+        categories = repeat('General')
+
+    faqs = [
+        {
+            'question': question,
+            'answer':   answer,
+            'category': category,
+            'triggers': _extract_keywords(question),
+        }
+        for question, answer, category in zip(questions[keep], answers[keep], categories)
+    ]
     return faqs, True
 
 
@@ -298,7 +328,6 @@ def _process_dataframe(df):
 
 
 def process_csv_upload(file):
-    import pandas as pd
     try:
         df = pd.read_csv(io.StringIO(file.stream.read().decode('utf-8')))
         return _process_dataframe(df)
@@ -308,7 +337,6 @@ def process_csv_upload(file):
 
 
 def process_excel_upload(file):
-    import pandas as pd
     try:
         df = pd.read_excel(file)
         return _process_dataframe(df)
@@ -319,13 +347,21 @@ def process_excel_upload(file):
 
 def process_pdf_upload(file):
     """Returns (faqs, truncated) — see extract_faqs_from_text()."""
-    import PyPDF2
     try:
         pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-        text = ""
+        use_ai     = _ai_helper and _ai_helper.enabled
+        # The AI path never reads past the extraction cap, so stop pulling
+        # pages once we're over it (by at least one char, so the truncated
+        # flag still fires). The structured parser wants the whole document.
+        text_cap = _EXTRACTION_CHUNK_SIZE * _MAX_EXTRACTION_CHUNKS if use_ai else None
+        buf = io.StringIO()
         for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        if _ai_helper and _ai_helper.enabled:
+            buf.write(page.extract_text() or '')   # None on image-only pages
+            buf.write('\n')
+            if text_cap is not None and buf.tell() > text_cap:
+                break
+        text = buf.getvalue()
+        if use_ai:
             return extract_faqs_from_text(text)
         else:
             return parse_structured_faq_text(text), False
@@ -540,8 +576,7 @@ def article_manager_page():
         return "Unauthorized", 403
 
     client     = models.get_client_by_id(client_id)
-    fresh_user = models.get_user_by_id(current_user.id)
-    plan_type  = (fresh_user or {}).get('plan_type', current_user.plan_type)
+    _user, plan_type, _limits = _current_plan()
 
     return render_template(
         'article-manager.html',
@@ -583,8 +618,7 @@ def manage_faqs():
                 return jsonify({'success': False, 'error': 'Request must be JSON'}), 400
 
             faqs_list   = request.json.get('faqs', [])
-            user        = models.get_user_by_id(current_user.id)
-            plan_limits = _plan_limits.get(user['plan_type'], _plan_limits['free'])
+            _user, plan_type, plan_limits = _current_plan()
             max_faqs    = plan_limits['faqs_per_client']
 
             if len(faqs_list) > max_faqs:
@@ -592,7 +626,7 @@ def manage_faqs():
                     'success': False,
                     'error': (
                         f'Plan limit: Maximum {max_faqs} FAQs allowed '
-                        f'on {user["plan_type"]} plan'
+                        f'on {plan_type} plan'
                     ),
                     'upgrade_required': True,
                 }), 403
@@ -641,8 +675,7 @@ def manage_faqs():
             return jsonify({'success': True, 'message': 'FAQs updated successfully'})
 
     except Exception as e:
-        current_app.logger.error(f'Error managing FAQs: {e}')
-        traceback.print_exc()
+        current_app.logger.exception(f'Error managing FAQs: {e}')
         return jsonify({'success': False, 'error': 'Failed to manage FAQs'}), 500
 
 
@@ -791,7 +824,7 @@ def upload_faqs():
         return jsonify(response)
 
     except Exception as e:
-        current_app.logger.error(f"[Upload] Error: {e}", exc_info=True)
+        current_app.logger.exception(f"[Upload] Error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -914,7 +947,7 @@ def import_faqs_from_url():
         return jsonify(response)
 
     except Exception as e:
-        current_app.logger.error(f'[ImportURL] Error: {e}', exc_info=True)
+        current_app.logger.exception(f'[ImportURL] Error: {e}')
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -925,8 +958,10 @@ def webhook_faq_import():
         _wh_secret = os.environ.get('WEBHOOK_SECRET', '').strip()
         if not _wh_secret:
             return jsonify({'error': 'Webhook not configured'}), 503
-        _provided = request.headers.get('X-Webhook-Secret', '')
-        if not hmac.compare_digest(_provided, _wh_secret):
+        # Signed (X-Webhook-Signature + X-Webhook-Timestamp) or legacy
+        # X-Webhook-Secret — see app_utils.verify_webhook_request.
+        if not verify_webhook_request(request.headers,
+                                      request.get_data(cache=True), _wh_secret):
             return jsonify({'error': 'Unauthorized'}), 401
 
         data          = request.json or {}
@@ -936,50 +971,49 @@ def webhook_faq_import():
         if not client_id or not incoming_faqs:
             return jsonify({'error': 'client_id and faqs required'}), 400
 
-        conn = cursor = None
-        saved = 0
-        try:
-            conn, cursor = models.get_db()
-            for faq in incoming_faqs:
-                question = faq.get('question', '').strip()
-                answer   = faq.get('answer', '').strip()
-                if not question or not answer:
-                    continue
-                triggers = _extract_keywords(question)
-                cursor.execute(
-                    '''
-                    INSERT INTO faqs (client_id, faq_id, question, answer, category, triggers)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ''',
-                    (
-                        client_id,
-                        str(uuid.uuid4()),
-                        question,
-                        answer,
-                        faq.get('category', 'General') if isinstance(faq, dict) else 'General',
-                        json.dumps(triggers)
+        rows = []
+        for faq in incoming_faqs:
+            question = faq.get('question', '').strip()
+            answer   = faq.get('answer', '').strip()
+            if not question or not answer:
+                continue
+            rows.append((
+                client_id,
+                str(uuid.uuid4()),
+                question,
+                answer,
+                faq.get('category', 'General') if isinstance(faq, dict) else 'General',
+                json.dumps(_extract_keywords(question)),
+            ))
+
+        # A re-delivered import (sender retry after a timeout) would insert
+        # every FAQ a second time. Dedupe only on a sender-supplied delivery
+        # id — the same body sent again on purpose (re-import after "delete
+        # all") is a new import, not a retry.
+        delivery_id = (request.headers.get('X-Webhook-Delivery') or '').strip()
+        idem_key    = f'faq-import:{client_id}:{delivery_id}' if delivery_id else None
+        if idem_key and not models.claim_idempotency_key(idem_key):
+            return jsonify({'success': True, 'duplicate': True, 'count': 0}), 200
+
+        # One multi-row INSERT per page instead of a round-trip per FAQ —
+        # same approach as _save_legacy_faqs.
+        if rows:
+            try:
+                with models.db_transaction() as (conn, cursor):
+                    execute_values(
+                        cursor,
+                        '''
+                        INSERT INTO faqs (client_id, faq_id, question, answer, category, triggers)
+                        VALUES %s
+                        ''',
+                        rows,
+                        page_size=500,
                     )
-                )
-                saved += 1
-            conn.commit()
-        except Exception as _db_err:
-            if conn:
-                try:
-                    conn.rollback()
-                except Exception:
-                    pass
-            raise _db_err
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except Exception:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
+            except Exception:
+                if idem_key:
+                    models.release_idempotency_key(idem_key)
+                raise
+        saved = len(rows)
 
         cache_utils.bump_kb_version(client_id)
         current_app.logger.info(
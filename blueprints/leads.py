@@ -35,7 +35,7 @@ import io
 import json
 import math
 
-from flask import Blueprint, jsonify, make_response, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app
 from flask_login import current_user, login_required
 from flask_mail import Message
 
@@ -280,11 +280,11 @@ def list_leads(client_id):
     except (ValueError, TypeError):
         return jsonify({'success': False, 'error': 'page and per_page must be integers'}), 400
 
-    # Filtering and search pushed into SQL — no Python-side loops needed
-    leads = models.get_leads(client_id, stage=stage, search=search)
-
-    total = len(leads)
-    leads = leads[(page - 1) * per_page: page * per_page]
+    # Filtering, search and paging pushed into SQL — only this page's rows
+    # are fetched, plus a COUNT for the pager.
+    total = models.count_leads(client_id, stage=stage, search=search)
+    leads = models.get_leads(client_id, stage=stage, search=search,
+                             limit=per_page, offset=(page - 1) * per_page)
     return jsonify({
         'success': True, 'leads': leads,
         'total': total, 'page': page, 'per_page': per_page
@@ -454,7 +454,6 @@ def export_leads(client_id):
 
     stage  = request.args.get('stage', '').strip()
     search = request.args.get('q', '').lower().strip()
-    leads  = models.get_leads(client_id, stage=stage, search=search)
 
     columns = [
         'id', 'name', 'email', 'phone', 'company', 'message',
@@ -463,13 +462,21 @@ def export_leads(client_id):
         'source_url', 'created_at', 'updated_at',
     ]
 
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(columns)
-    for lead in leads:
-        writer.writerow([lead.get(col) or '' for col in columns])
-
-    response = make_response(buf.getvalue())
+    def generate():
+        # Streamed: leads come off a server-side cursor and go out one CSV
+        # line at a time, so a large export never sits in memory whole.
+        buf    = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        for lead in models.iter_leads(client_id, stage=stage, search=search):
+            writer.writerow([lead.get(col) or '' for col in columns])
+            if buf.tell() >= 64 * 1024:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    response = Response(generate(), mimetype='text/csv')
     response.headers['Content-Type']        = 'text/csv; charset=utf-8'
     response.headers['Content-Disposition'] = f'attachment; filename="leads_{client_id}.csv"'
     return response
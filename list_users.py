@@ -1,9 +1,11 @@
+import sys
+
 import models
 
-conn = models.get_db()
-cursor = conn.cursor()
+conn, cursor = models.get_db()
 cursor.execute("SELECT email, plan_type, created_at FROM users ORDER BY created_at DESC")
 users = cursor.fetchall()
+cursor.close()
 conn.close()
 
 print("\n" + "="*70)
@@ -12,8 +14,14 @@ print("="*70)
 print(f"{'Email':<35} {'Plan':<12} {'Created':<20}")
 print("-"*70)
 
-for user in users:
-    print(f"{user['email']:<35} {user['plan_type']:<12} {user['created_at']:<20}")
+# One write for the whole table instead of a print() per row.
+# created_at is a datetime, so str() it before padding — a format spec
+# on a datetime goes through strftime and would print '<20' literally.
+if users:
+    sys.stdout.write("\n".join(
+        f"{user['email']:<35} {user['plan_type'] or '':<12} {str(user['created_at']):<20}"
+        for user in users
+    ) + "\n")
 
 print("-"*70)
-print(f"Total users: {len(users)}\n")
\ No newline at end of file
+print(f"Total users: {len(users)}\n")
@@ -16,11 +16,14 @@ Row counts are compared between SQLite and Postgres at the end.
 """
 
 import argparse
+import csv
+import io
 import json
 import logging
 import os
 import sqlite3
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime
 
@@ -131,9 +134,13 @@ def batch_upsert(pg_cursor, sql, rows, label):
     inserted = skipped = 0
     try:
         with savepoint(pg_cursor, "batch"):
-            execute_values(pg_cursor, sql, rows)
+            # page_size=len(rows): execute_values' default of 100 split each
+            # CHUNK_SIZE batch into several statements, and rowcount only
+            # reported the last one — so "inserted" under-counted.
+            execute_values(pg_cursor, sql, rows, page_size=len(rows))
             # rowcount reflects actual inserts (skipped rows don't count)
             inserted = pg_cursor.rowcount if pg_cursor.rowcount >= 0 else len(rows)
+            skipped  = len(rows) - inserted
     except Exception as e:
         log.warning("  Batch insert failed for %s, falling back row-by-row: %s", label, e)
         for row in rows:
@@ -150,26 +157,133 @@ def batch_upsert(pg_cursor, sql, rows, label):
     return inserted, skipped
 
 
+# ── COPY fast path ────────────────────────────────────────────────────────────
+class _CsvStream:
+    """
+    Read-only file object over a row iterator, for copy_expert. Rows are
+    CSV-encoded as COPY asks for more data, so a table is streamed to
+    Postgres without ever being held in memory as one buffer.
+    QUOTE_NOTNULL leaves None as a bare empty field, which COPY reads as
+    NULL, while '' is quoted and stays an empty string.
+    """
+
+    def __init__(self, rows):
+        self._rows    = iter(rows)
+        self._buf     = io.StringIO()
+        self._writer  = csv.writer(self._buf, quoting=csv.QUOTE_NOTNULL, lineterminator="\n")
+        self._pending = ""
+        self.count    = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self.count += 1
+            self._pending += self._buf.getvalue()
+            self._buf.seek(0)
+            self._buf.truncate()
+        if size < 0:
+            out, self._pending = self._pending, ""
+        else:
+            out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+
+def copy_upsert(pg_cursor, table, columns, conflict, rows):
+    """
+    Bulk-load rows with COPY: stream them into a temp staging table, then
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING into the real one (COPY
+    itself can't skip conflicts). One protocol round for the whole table
+    instead of one statement per chunk.
+    Returns (inserted, skipped), or None if the load failed — the savepoint
+    undoes it and the caller re-runs the table through batch_upsert, whose
+    row-by-row fallback names the offending row.
+    """
+    cols  = ", ".join(columns)
+    stage = "stage_%s" % table
+    try:
+        with savepoint(pg_cursor, "copy"):
+            pg_cursor.execute(
+                "CREATE TEMP TABLE %s AS SELECT %s FROM %s WITH NO DATA" % (stage, cols, table)
+            )
+            stream = _CsvStream(rows)
+            pg_cursor.copy_expert(
+                "COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (stage, cols), stream
+            )
+            pg_cursor.execute(
+                "INSERT INTO %s (%s) SELECT %s FROM %s ON CONFLICT (%s) DO NOTHING"
+                % (table, cols, cols, stage, conflict)
+            )
+            inserted = pg_cursor.rowcount
+            pg_cursor.execute("DROP TABLE %s" % stage)
+    except Exception as e:
+        log.warning("  COPY load failed for %s, falling back to batched inserts: %s", table, e)
+        return None
+    return inserted, stream.count - inserted
+
+
+def upsert_table(sqlite_cursor, pg_cursor, table, columns, conflict, to_row):
+    """
+    Copy one SQLite table into Postgres. `to_row` maps a SQLite row dict to
+    a tuple in `columns` order. Tries copy_upsert first; on failure re-reads
+    the table and goes through batch_upsert chunk by chunk.
+    Table/column names come from the hardcoded per-table functions below,
+    never user input, so %-interpolating them into SQL is safe.
+    """
+    result = copy_upsert(
+        pg_cursor, table, columns, conflict,
+        (to_row(r) for chunk in iter_sqlite(sqlite_cursor, table) for r in chunk),
+    )
+    if result is None:
+        sql = "INSERT INTO %s (%s) VALUES %%s ON CONFLICT (%s) DO NOTHING" % (
+            table, ", ".join(columns), conflict
+        )
+        inserted = skipped = 0
+        for chunk in iter_sqlite(sqlite_cursor, table):
+            i, s = batch_upsert(pg_cursor, sql, [to_row(r) for r in chunk], table)
+            inserted += i; skipped += s
+        result = (inserted, skipped)
+    log.info("  %s done — inserted: %d, skipped/existing: %d", table, *result)
+    return {"inserted": result[0], "skipped": result[1]}
+
+
 # ── Per-table migration functions ─────────────────────────────────────────────
 
 def migrate_users(sqlite_cursor, pg_cursor):
     log.info("Migrating users...")
-    sql = """
-        INSERT INTO users (id, email, password_hash, created_at, plan_type)
-        VALUES %s
-        ON CONFLICT (email) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "users"):
-        rows = [
-            (r["id"], r["email"], r["password_hash"],
-             r["created_at"], r.get("plan_type") or "free")
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "users")
-        inserted += i; skipped += s
-    log.info("  users done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "users",
+        ("id", "email", "password_hash", "created_at", "plan_type"),
+        "email",
+        lambda r: (r["id"], r["email"], r["password_hash"],
+                   r["created_at"], r.get("plan_type") or "free"),
+    )
+
+
+def _client_row(r):
+    raw = r.get("branding_settings")
+    try:
+        settings = json.loads(raw) if raw else {}
+    except (json.JSONDecodeError, TypeError):
+        settings = {}
+    # Decoded once; each section is looked up once. Non-dict JSON ("null",
+    # a list) would otherwise raise AttributeError and fail the whole load.
+    if not isinstance(settings, dict):
+        settings = {}
+    branding = settings.get("branding")
+    branding = branding if isinstance(branding, dict) else {}
+    bot      = settings.get("bot_settings")
+    bot      = bot if isinstance(bot, dict) else {}
+    return (
+        r["id"], r["user_id"], r["client_id"], r["company_name"],
+        raw,
+        branding.get("primary_color"),
+        bot.get("welcome_message"),
+        bool(branding.get("remove_branding", False)),
+        r["created_at"],
+    )
 
 
 def migrate_clients(sqlite_cursor, pg_cursor):
@@ -180,58 +294,29 @@ def migrate_clients(sqlite_cursor, pg_cursor):
     except Exception as exc:
         log.warning("  Could not run clients migration helper: %s", exc)
 
-    sql = """
-        INSERT INTO clients
-            (id, user_id, client_id, company_name, branding_settings,
-             widget_color, welcome_message, remove_branding, created_at)
-        VALUES %s
-        ON CONFLICT (client_id) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "clients"):
-        rows = []
-        for r in chunk:
-            try:
-                branding = json.loads(r.get("branding_settings") or "{}")
-            except (json.JSONDecodeError, TypeError):
-                branding = {}
-            rows.append((
-                r["id"], r["user_id"], r["client_id"], r["company_name"],
-                r.get("branding_settings"),
-                branding.get("branding", {}).get("primary_color"),
-                branding.get("bot_settings", {}).get("welcome_message"),
-                bool(branding.get("branding", {}).get("remove_branding", False)),
-                r["created_at"],
-            ))
-        i, s = batch_upsert(pg_cursor, sql, rows, "clients")
-        inserted += i; skipped += s
-    log.info("  clients done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "clients",
+        ("id", "user_id", "client_id", "company_name", "branding_settings",
+         "widget_color", "welcome_message", "remove_branding", "created_at"),
+        "client_id",
+        _client_row,
+    )
 
 
 def migrate_faqs(sqlite_cursor, pg_cursor):
     log.info("Migrating FAQs...")
     # ON CONFLICT must name the unique column — without a target, Postgres
     # falls back to the PK and will silently insert duplicate faq_ids.
-    sql = """
-        INSERT INTO faqs
-            (id, client_id, faq_id, question, answer, category, triggers, created_at)
-        VALUES %s
-        ON CONFLICT (faq_id) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "faqs"):
-        rows = [
-            (r["id"], r["client_id"], r["faq_id"],
-             r["question"], r["answer"],
-             r.get("category") or "General",
-             r.get("triggers"), r["created_at"])
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "faqs")
-        inserted += i; skipped += s
-    log.info("  faqs done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "faqs",
+        ("id", "client_id", "faq_id", "question", "answer", "category",
+         "triggers", "created_at"),
+        "faq_id",
+        lambda r: (r["id"], r["client_id"], r["faq_id"],
+                   r["question"], r["answer"],
+                   r.get("category") or "General",
+                   r.get("triggers"), r["created_at"]),
+    )
 
 
 def migrate_leads(sqlite_cursor, pg_cursor):
@@ -239,25 +324,15 @@ def migrate_leads(sqlite_cursor, pg_cursor):
     # Conflict on PK id — leads has no natural unique column.
     # Without a target, ON CONFLICT DO NOTHING is a no-op and every re-run
     # duplicates every lead.
-    sql = """
-        INSERT INTO leads
-            (id, client_id, name, email, phone, company,
-             message, conversation_snippet, source_url, created_at)
-        VALUES %s
-        ON CONFLICT (id) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "leads"):
-        rows = [
-            (r["id"], r["client_id"], r.get("name"), r.get("email"),
-             r.get("phone"), r.get("company"), r.get("message"),
-             r.get("conversation_snippet"), r.get("source_url"), r["created_at"])
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "leads")
-        inserted += i; skipped += s
-    log.info("  leads done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "leads",
+        ("id", "client_id", "name", "email", "phone", "company",
+         "message", "conversation_snippet", "source_url", "created_at"),
+        "id",
+        lambda r: (r["id"], r["client_id"], r.get("name"), r.get("email"),
+                   r.get("phone"), r.get("company"), r.get("message"),
+                   r.get("conversation_snippet"), r.get("source_url"), r["created_at"]),
+    )
 
 
 def _table_exists_in_sqlite(sqlite_cursor, table):
@@ -273,28 +348,18 @@ def migrate_affiliates(sqlite_cursor, pg_cursor):
         log.info("  affiliates not in SQLite — skipping")
         return {"inserted": 0, "skipped": 0}
 
-    sql = """
-        INSERT INTO affiliates
-            (id, user_id, referral_code, commission_rate, total_earnings,
-             total_referrals, payment_email, payment_method,
-             bank_details, status, created_at)
-        VALUES %s
-        ON CONFLICT (referral_code) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "affiliates"):
-        rows = [
-            (r["id"], r["user_id"], r["referral_code"],
-             r.get("commission_rate", 0.20), r.get("total_earnings", 0),
-             r.get("total_referrals", 0), r.get("payment_email"),
-             r.get("payment_method"), r.get("bank_details"),
-             r.get("status", "active"), r["created_at"])
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "affiliates")
-        inserted += i; skipped += s
-    log.info("  affiliates done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "affiliates",
+        ("id", "user_id", "referral_code", "commission_rate", "total_earnings",
+         "total_referrals", "payment_email", "payment_method",
+         "bank_details", "status", "created_at"),
+        "referral_code",
+        lambda r: (r["id"], r["user_id"], r["referral_code"],
+                   r.get("commission_rate", 0.20), r.get("total_earnings", 0),
+                   r.get("total_referrals", 0), r.get("payment_email"),
+                   r.get("payment_method"), r.get("bank_details"),
+                   r.get("status", "active"), r["created_at"]),
+    )
 
 
 def migrate_referrals(sqlite_cursor, pg_cursor):
@@ -303,23 +368,13 @@ def migrate_referrals(sqlite_cursor, pg_cursor):
         log.info("  referrals not in SQLite — skipping")
         return {"inserted": 0, "skipped": 0}
 
-    sql = """
-        INSERT INTO referrals
-            (id, affiliate_id, referred_user_id, referral_code, status, created_at)
-        VALUES %s
-        ON CONFLICT (id) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "referrals"):
-        rows = [
-            (r["id"], r["affiliate_id"], r.get("referred_user_id"),
-             r["referral_code"], r.get("status", "pending"), r["created_at"])
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "referrals")
-        inserted += i; skipped += s
-    log.info("  referrals done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "referrals",
+        ("id", "affiliate_id", "referred_user_id", "referral_code", "status", "created_at"),
+        "id",
+        lambda r: (r["id"], r["affiliate_id"], r.get("referred_user_id"),
+                   r["referral_code"], r.get("status", "pending"), r["created_at"]),
+    )
 
 
 def migrate_commissions(sqlite_cursor, pg_cursor):
@@ -328,25 +383,15 @@ def migrate_commissions(sqlite_cursor, pg_cursor):
         log.info("  commissions not in SQLite — skipping")
         return {"inserted": 0, "skipped": 0}
 
-    sql = """
-        INSERT INTO commissions
-            (id, affiliate_id, referred_user_id, amount, status,
-             payment_date, created_at)
-        VALUES %s
-        ON CONFLICT (id) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "commissions"):
-        rows = [
-            (r["id"], r["affiliate_id"], r.get("referred_user_id"),
-             r.get("amount", 0), r.get("status", "pending"),
-             r.get("payment_date"), r["created_at"])
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "commissions")
-        inserted += i; skipped += s
-    log.info("  commissions done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "commissions",
+        ("id", "affiliate_id", "referred_user_id", "amount", "status",
+         "payment_date", "created_at"),
+        "id",
+        lambda r: (r["id"], r["affiliate_id"], r.get("referred_user_id"),
+                   r.get("amount", 0), r.get("status", "pending"),
+                   r.get("payment_date"), r["created_at"]),
+    )
 
 
 def migrate_conversations(sqlite_cursor, pg_cursor):
@@ -359,24 +404,14 @@ def migrate_conversations(sqlite_cursor, pg_cursor):
         log.info("  conversations not in SQLite — skipping")
         return {"inserted": 0, "skipped": 0}
 
-    sql = """
-        INSERT INTO conversations
-            (id, client_id, user_message, bot_response, matched, method, timestamp)
-        VALUES %s
-        ON CONFLICT (id) DO NOTHING
-    """
-    inserted = skipped = 0
-    for chunk in iter_sqlite(sqlite_cursor, "conversations"):
-        rows = [
-            (r["id"], r["client_id"], r["user_message"], r["bot_response"],
-             bool(r.get("matched", False)), r.get("method", "unknown"),
-             r.get("timestamp"))
-            for r in chunk
-        ]
-        i, s = batch_upsert(pg_cursor, sql, rows, "conversations")
-        inserted += i; skipped += s
-    log.info("  conversations done — inserted: %d, skipped/existing: %d", inserted, skipped)
-    return {"inserted": inserted, "skipped": skipped}
+    return upsert_table(
+        sqlite_cursor, pg_cursor, "conversations",
+        ("id", "client_id", "user_message", "bot_response", "matched", "method", "timestamp"),
+        "id",
+        lambda r: (r["id"], r["client_id"], r["user_message"], r["bot_response"],
+                   bool(r.get("matched", False)), r.get("method", "unknown"),
+                   r.get("timestamp")),
+    )
 
 
 # ── Sequence repair ───────────────────────────────────────────────────────────
@@ -449,6 +484,47 @@ ALL_MIGRATIONS = {
 }
 
 
+# FK order for a full run. Tables within a phase don't reference each other,
+# so they load in parallel (one worker + connection pair each); a phase only
+# starts once every table in the previous one has committed.
+MIGRATION_PHASES = (
+    ("users",),
+    ("clients", "affiliates"),
+    ("faqs", "leads", "conversations", "referrals", "commissions"),
+)
+
+
+def migrate_table(name, sqlite_cursor, pg_conn, pg_cursor, dry_run):
+    """Run one table's migration as its own transaction (committed unless dry_run)."""
+    # Don't wait on a WAL flush at commit — the run is idempotent (ON
+    # CONFLICT DO NOTHING), so a table lost to a server crash is just
+    # re-migrated — and check any DEFERRABLE FKs once at commit, not per row.
+    pg_cursor.execute("SET LOCAL synchronous_commit = OFF")
+    pg_cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+    ALL_MIGRATIONS[name](sqlite_cursor, pg_cursor)
+    # Commit after each table so progress is preserved if a later table
+    # fails. A single end-commit means one failure rolls back everything.
+    if not dry_run:
+        pg_conn.commit()
+        log.info("  Committed %s to Postgres\n", name)
+
+
+def _migrate_table_worker(name):
+    """Thread body for a parallel phase: private SQLite + Postgres connections."""
+    sqlite_conn = open_sqlite(SQLITE_DB)
+    pg_conn     = open_postgres(DATABASE_URL)
+    pg_cursor   = pg_conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    try:
+        migrate_table(name, sqlite_conn.cursor(), pg_conn, pg_cursor, dry_run=False)
+    except Exception:
+        pg_conn.rollback()
+        raise
+    finally:
+        pg_cursor.close()
+        pg_conn.close()
+        sqlite_conn.close()
+
+
 # ── Entry point ───────────────────────────────────────────────────────────────
 def main():
     args = parse_args()
@@ -470,25 +546,25 @@ def main():
     start = datetime.now()
 
     try:
-        to_run = (
-            {args.table: ALL_MIGRATIONS[args.table]}
-            if args.table
-            else ALL_MIGRATIONS
-        )
+        to_run = [args.table] if args.table else list(ALL_MIGRATIONS)
 
-        for name, fn in to_run.items():
-            fn(sqlite_cursor, pg_cursor)
-            # Commit after each table so progress is preserved if a later table
-            # fails. A single end-commit means one failure rolls back everything.
-            if not args.dry_run:
-                pg_conn.commit()
-                log.info("  Committed %s to Postgres\n", name)
+        if args.table or args.dry_run:
+            # Serial on the one connection: --dry-run needs every table in a
+            # single transaction so the final rollback undoes all of it.
+            for name in to_run:
+                migrate_table(name, sqlite_cursor, pg_conn, pg_cursor, args.dry_run)
+        else:
+            for phase in MIGRATION_PHASES:
+                with ThreadPoolExecutor(max_workers=len(phase)) as pool:
+                    # list() re-raises the first worker failure here, before
+                    # the next phase can start on top of a missing parent.
+                    list(pool.map(_migrate_table_worker, phase))
 
         fix_sequences(pg_cursor)
         if not args.dry_run:
             pg_conn.commit()
 
-        verify_counts(sqlite_cursor, pg_cursor, list(to_run.keys()))
+        verify_counts(sqlite_cursor, pg_cursor, to_run)
 
         elapsed = (datetime.now() - start).total_seconds()
 
@@ -16,6 +16,7 @@ The split is purely internal to this package.
 from .db import (
     get_db,
     get_db_connection,
+    db_transaction,
 )
 
 # ── Schema migrations ─────────────────────────────────────────────────────────
@@ -131,6 +132,9 @@ from .clients import (
     create_client,
     get_user_clients,
     get_client_by_id,
+    get_clients_by_ids,
+    get_client_by_id_cached,
+    invalidate_client_cache,
     get_client_owner_id,
     verify_client_ownership,
     delete_client,
@@ -180,6 +184,8 @@ from .leads import (
     delete_lead_by_client,
     bulk_update_leads,
     get_leads,
+    count_leads,
+    iter_leads,
     get_all_leads_admin,
     admin_delete_lead,
 )
@@ -224,6 +230,8 @@ from .webhooks import (
     regenerate_signing_secret,
     log_webhook_delivery,
     get_webhook_logs,
+    claim_idempotency_key,
+    release_idempotency_key,
 )
 
 # ── External client integrations (agentic tool calls) ─────────────────────────
@@ -295,6 +303,7 @@ from .affiliate import (
 from .analytics import (
     get_user_count_by_plan,
     get_new_users_this_month,
+    invalidate_user_stats_cache,
     get_user_growth_by_month,
     admin_update_user,
     admin_delete_user,
@@ -369,6 +378,9 @@ from .migrations import (
     migrate_ai_employee_plan_rename,  # Shopify/WooCommerce pivot: agency -> ai_scale
     migrate_cart_recovery,          # abandoned_carts table + clients.cart_recovery_enabled
     migrate_admin_activity_tracking,  # admin dashboard: users activity cols + analytics_events IP/UA
+    migrate_analytics_indexes,        # (client_id, timestamp) indexes for the analytics page
+    migrate_lookup_indexes,           # FK-column indexes (clients.user_id, faqs.client_id, ...)
+    migrate_idempotency_keys,         # inbound webhook dedupe (idempotency_keys table)
 )
 
 # ── Cart recovery ─────────────────────────────────────────────────────────────
@@ -117,23 +117,26 @@ def create_commission(affiliate_id, referred_user_id, subscription_amount, plan_
     conn = cursor = None
     try:
         conn, cursor = get_db()
-        cursor.execute('SELECT commission_rate FROM affiliates WHERE id = %s', (affiliate_id,))
-        result = cursor.fetchone()
-        commission_rate = result['commission_rate'] if result else 0.30
-        commission_amount = subscription_amount * commission_rate
+        # One statement: the commission amount is computed server-side from
+        # the affiliate's rate (0.30 if the affiliate row is missing), and
+        # the earnings/referral updates ride along as writable CTEs.
         cursor.execute(
-            '''INSERT INTO commissions (affiliate_id, referred_user_id, amount, subscription_amount, plan_type, status)
-               VALUES (%s, %s, %s, %s, %s, %s)''',
-            (affiliate_id, referred_user_id, commission_amount, subscription_amount, plan_type, 'pending')
-        )
-        cursor.execute(
-            'UPDATE affiliates SET total_earnings = total_earnings + %s WHERE id = %s',
-            (commission_amount, affiliate_id)
-        )
-        cursor.execute(
-            '''UPDATE referrals SET status = 'converted', converted_at = CURRENT_TIMESTAMP
-               WHERE affiliate_id = %s AND referred_user_id = %s''',
-            (affiliate_id, referred_user_id)
+            '''WITH ins AS (
+                   INSERT INTO commissions
+                       (affiliate_id, referred_user_id, amount, subscription_amount, plan_type, status)
+                   SELECT %(aff)s, %(ref)s,
+                          %(sub)s * COALESCE(
+                              (SELECT commission_rate FROM affiliates WHERE id = %(aff)s), 0.30),
+                          %(sub)s, %(plan)s, 'pending'
+                   RETURNING amount
+               ), earn AS (
+                   UPDATE affiliates SET total_earnings = total_earnings + (SELECT amount FROM ins)
+                   WHERE id = %(aff)s
+               )
+               UPDATE referrals SET status = 'converted', converted_at = CURRENT_TIMESTAMP
+               WHERE affiliate_id = %(aff)s AND referred_user_id = %(ref)s''',
+            {'aff': affiliate_id, 'ref': referred_user_id,
+             'sub': subscription_amount, 'plan': plan_type}
         )
         conn.commit()
     except Exception as e:
@@ -155,28 +158,32 @@ def get_affiliate_stats(affiliate_id):
     conn = cursor = None
     try:
         conn, cursor = get_db()
-        cursor.execute('SELECT * FROM affiliates WHERE id = %s', (affiliate_id,))
+        # One round-trip: the affiliate row plus its referral breakdown and
+        # commission sums as extra columns (popped off below).
+        cursor.execute(
+            """SELECT a.*,
+                      (SELECT json_object_agg(r.status, r.count)
+                         FROM (SELECT status, COUNT(*) AS count FROM referrals
+                                WHERE affiliate_id = a.id AND status IS NOT NULL
+                                GROUP BY status) r)              AS _referral_stats,
+                      c.pending                                  AS _pending_earnings,
+                      c.paid                                     AS _paid_earnings
+                 FROM affiliates a
+                 CROSS JOIN LATERAL (
+                     SELECT SUM(amount) FILTER (WHERE status = 'pending') AS pending,
+                            SUM(amount) FILTER (WHERE status = 'paid')    AS paid
+                       FROM commissions WHERE affiliate_id = a.id
+                 ) c
+                WHERE a.id = %s""",
+            (affiliate_id,)
+        )
         row = cursor.fetchone()
         if row is None:
             return None   # BUG-04 fix: fetchone() can return None
         affiliate = dict(row)
-        cursor.execute(
-            'SELECT status, COUNT(*) as count FROM referrals WHERE affiliate_id = %s GROUP BY status',
-            (affiliate_id,)
-        )
-        referral_stats = {row['status']: row['count'] for row in cursor.fetchall()}
-        cursor.execute(
-            "SELECT SUM(amount) as pending FROM commissions WHERE affiliate_id = %s AND status = 'pending'",
-            (affiliate_id,)
-        )
-        pending_result = cursor.fetchone()
-        pending_earnings = (pending_result.get('pending') or 0) if pending_result else 0
-        cursor.execute(
-            "SELECT SUM(amount) as paid FROM commissions WHERE affiliate_id = %s AND status = 'paid'",
-            (affiliate_id,)
-        )
-        paid_result = cursor.fetchone()
-        paid_earnings = (paid_result.get('paid') or 0) if paid_result else 0
+        referral_stats   = affiliate.pop('_referral_stats') or {}
+        pending_earnings = affiliate.pop('_pending_earnings') or 0
+        paid_earnings    = affiliate.pop('_paid_earnings') or 0
         return {
             'affiliate': affiliate,
             'referral_stats': referral_stats,
@@ -5,9 +5,12 @@ Platform analytics — revenue, user growth, conversion funnel,
 API cost tracking, DB stats, and admin-level reporting queries.
 """
 import json
+import threading
+import time
 from datetime import datetime
-from .db import get_db
+from .db import db_transaction, get_db
 from .billing import get_all_users
+from .clients import _CLIENT_CHILD_TABLES, invalidate_client_cache
 
 # ── Per-token pricing, by provider ─────────────────────────────────────────
 # Source: provider list prices. OpenRouter aggregates multiple hosting
@@ -56,8 +59,39 @@ def _calc_cost(input_tokens, output_tokens, model: str = 'gemini'):
     )
 
 
+# The admin dashboard calls the user-count helpers on every load (twice,
+# for the plan breakdown). Cached briefly per process; the admin-side
+# writes (admin_update_user, admin_delete_user) and create_user clear it
+# so the admin sees their own change straight away.
+_user_stats_cache: dict = {}
+_user_stats_cache_lock = threading.Lock()
+_USER_STATS_TTL_SECONDS = 60
+
+
+def invalidate_user_stats_cache():
+    """Drop the cached user counts (after a signup, plan change or delete)."""
+    with _user_stats_cache_lock:
+        _user_stats_cache.clear()
+
+
+def _cached_user_stat(key, compute):
+    now = time.time()
+    with _user_stats_cache_lock:
+        cached = _user_stats_cache.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+    value = compute()
+    with _user_stats_cache_lock:
+        _user_stats_cache[key] = (value, now + _USER_STATS_TTL_SECONDS)
+    return value
+
+
 def get_user_count_by_plan():
     """Users grouped by plan_type."""
+    return dict(_cached_user_stat('by_plan', _query_user_count_by_plan))
+
+
+def _query_user_count_by_plan():
     conn, cursor = get_db()
     cursor.execute(
         'SELECT plan_type, COUNT(*) AS cnt FROM users GROUP BY plan_type ORDER BY cnt DESC'
@@ -70,10 +104,15 @@ def get_user_count_by_plan():
 
 def get_new_users_this_month():
     """Count signups in the current calendar month."""
+    return _cached_user_stat('new_this_month', _query_new_users_this_month)
+
+
+def _query_new_users_this_month():
     conn, cursor = get_db()
     cursor.execute(
         """SELECT COUNT(*) AS cnt FROM users
-           WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)"""
+           WHERE created_at >= DATE_TRUNC('month', CURRENT_DATE)
+             AND created_at <  DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '1 month'"""
     )
     row = cursor.fetchone()
     cursor.close()
@@ -119,8 +158,10 @@ def admin_update_user(user_id, plan_type=None, subscription_status=None, is_admi
     - plan_type == 'free' or 'enterprise': both expiry fields are cleared
       regardless of grace_days (free has nothing to expire from;
       enterprise is excluded from the downgrade query entirely).
+
+    Returns True if a user row was updated, False if there was nothing to
+    set or no such user.
     """
-    conn, cursor = get_db()
     updates = []
     params = []
     if plan_type is not None:
@@ -148,42 +189,64 @@ def admin_update_user(user_id, plan_type=None, subscription_status=None, is_admi
         updates.append('is_admin = %s')
         params.append(bool(is_admin))
     if not updates:
-        cursor.close()
-        conn.close()
         return False
     params.append(user_id)
-    cursor.execute('UPDATE users SET ' + ', '.join(updates) + ' WHERE id = %s', params)
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return True
+    with db_transaction() as (conn, cursor):
+        cursor.execute('UPDATE users SET ' + ', '.join(updates) + ' WHERE id = %s', params)
+        updated = cursor.rowcount > 0
+    invalidate_user_stats_cache()
+    return updated
+
+
+# Rows keyed on the user (not on one of their clients), deleted after the
+# clients. Same list and order as the old statement-per-table version.
+_USER_OWNED_DELETES = (
+    ('commissions',      'referred_user_id'),
+    ('referrals',        'referred_user_id'),
+    ('affiliates',       'user_id'),
+    ('payments',         'user_id'),
+    ('analytics_events', 'user_id'),
+)
+
+# One statement for the whole cascade: every client's child rows (the
+# same table list delete_client uses), the clients, the user-keyed rows
+# and the user. All CTEs see the same snapshot, so owned still lists the
+# clients while d_clients deletes them, and the NO ACTION FKs are only
+# checked once the statement is done.
+_ADMIN_DELETE_USER_SQL = (
+    'WITH owned AS (SELECT client_id FROM clients WHERE user_id = %(uid)s), '
+    + ''.join(
+        f'd_{table} AS (DELETE FROM {table} '
+        f'WHERE client_id IN (SELECT client_id FROM owned)), '
+        for table in _CLIENT_CHILD_TABLES
+    )
+    + 'd_clients AS (DELETE FROM clients WHERE user_id = %(uid)s RETURNING client_id), '
+    + ''.join(
+        f'd_{table} AS (DELETE FROM {table} WHERE {column} = %(uid)s), '
+        for table, column in _USER_OWNED_DELETES
+    )
+    + 'd_users AS (DELETE FROM users WHERE id = %(uid)s) '
+    + 'SELECT client_id FROM d_clients'
+)
 
 
 def admin_delete_user(user_id):
-    """Hard-delete a user and cascade all their data."""
+    """Hard-delete a user and cascade all their data in one statement."""
     conn, cursor = get_db()
     try:
-        cursor.execute('SELECT client_id FROM clients WHERE user_id = %s', (user_id,))
+        cursor.execute(_ADMIN_DELETE_USER_SQL, {'uid': user_id})
         client_ids = [r['client_id'] for r in cursor.fetchall()]
-        for cid in client_ids:
-            cursor.execute('DELETE FROM conversations WHERE client_id = %s', (cid,))
-            cursor.execute('DELETE FROM leads WHERE client_id = %s', (cid,))
-            cursor.execute('DELETE FROM faqs WHERE client_id = %s', (cid,))
-        cursor.execute('DELETE FROM clients WHERE user_id = %s', (user_id,))
-        cursor.execute('DELETE FROM commissions WHERE referred_user_id = %s', (user_id,))
-        cursor.execute('DELETE FROM referrals WHERE referred_user_id = %s', (user_id,))
-        cursor.execute('DELETE FROM affiliates WHERE user_id = %s', (user_id,))
-        cursor.execute('DELETE FROM payments WHERE user_id = %s', (user_id,))
-        cursor.execute('DELETE FROM analytics_events WHERE user_id = %s', (user_id,))
-        cursor.execute('DELETE FROM users WHERE id = %s', (user_id,))
         conn.commit()
-        return True
     except Exception:
         conn.rollback()
         raise
     finally:
         cursor.close()
         conn.close()
+    for cid in client_ids:
+        invalidate_client_cache(cid)
+    invalidate_user_stats_cache()
+    return True
 
 
 def get_all_leads_admin(limit=500, client_id_filter=None, search=None):
@@ -203,13 +266,16 @@ def get_all_leads_admin(limit=500, client_id_filter=None, search=None):
         params.extend(['%' + search + '%', '%' + search + '%'])
     query += ' ORDER BY l.created_at DESC LIMIT %s'
     params.append(limit)
-    cursor.execute(query, params)
-    rows = [dict(r) for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    for r in rows:
-        if r.get('created_at'):
-            r['created_at'] = r['created_at'].isoformat()
+    rows = []
+    try:
+        cursor.execute(query, params)
+        for r in cursor:
+            if r.get('created_at'):
+                r['created_at'] = r['created_at'].isoformat()
+            rows.append(r)
+    finally:
+        cursor.close()
+        conn.close()
     return rows
 
 
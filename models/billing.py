@@ -4,10 +4,10 @@ models/billing.py
 Subscription lifecycle, payment recording, admin billing operations,
 and agency overage seat recording.
 """
-import json
 import uuid
 from datetime import datetime
-from .db import get_db
+from .db import db_transaction, get_db
+from .jsonutil import json_dumps
 
 def update_user_subscription(user_id, plan_type, billing_provider='flutterwave',
                               subscription_id=None, is_annual=False):
@@ -186,7 +186,7 @@ def track_event(event_name, user_id=None, metadata=None, ip_address=None, user_a
         cursor.execute(
             'INSERT INTO analytics_events (user_id, event_name, metadata, ip_address, user_agent) '
             'VALUES (%s, %s, %s, %s, %s)',
-            (user_id, event_name, json.dumps(metadata) if metadata else None,
+            (user_id, event_name, json_dumps(metadata) if metadata else None,
              ip_address, user_agent)
         )
         if user_id:
@@ -275,18 +275,16 @@ def record_payment(user_id, amount, plan_type, provider='manual', currency='USD'
 
 def get_all_payments(limit=200):
     """Get recent payments joined with user email."""
-    conn, cursor = get_db()
-    cursor.execute(
-        '''SELECT p.*, u.email
-           FROM payments p
-           JOIN users u ON p.user_id = u.id
-           ORDER BY p.payment_date DESC
-           LIMIT %s''',
-        (limit,)
-    )
-    rows = [dict(r) for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
+    with db_transaction() as (conn, cursor):
+        cursor.execute(
+            '''SELECT p.*, u.email
+               FROM payments p
+               JOIN users u ON p.user_id = u.id
+               ORDER BY p.payment_date DESC
+               LIMIT %s''',
+            (limit,)
+        )
+        rows = [dict(r) for r in cursor.fetchall()]
     for r in rows:
         if r.get('payment_date'):
             r['payment_date'] = r['payment_date'].isoformat()
@@ -295,46 +293,41 @@ def get_all_payments(limit=200):
 
 def get_mrr():
     """Sum completed payments in the current calendar month."""
-    conn, cursor = get_db()
-    cursor.execute(
-        """SELECT COALESCE(SUM(amount), 0) AS mrr
-           FROM payments
-           WHERE status = 'completed'
-             AND DATE_TRUNC('month', payment_date) = DATE_TRUNC('month', CURRENT_DATE)"""
-    )
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_transaction() as (conn, cursor):
+        cursor.execute(
+            """SELECT COALESCE(SUM(amount), 0) AS mrr
+               FROM payments
+               WHERE status = 'completed'
+                 AND payment_date >= DATE_TRUNC('month', CURRENT_DATE)
+                 AND payment_date <  DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '1 month'"""
+        )
+        row = cursor.fetchone()
     return float(row['mrr']) if row else 0.0
 
 
 def get_total_revenue():
     """Sum of all completed payments ever."""
-    conn, cursor = get_db()
-    cursor.execute("SELECT COALESCE(SUM(amount), 0) AS total FROM payments WHERE status = 'completed'")
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_transaction() as (conn, cursor):
+        cursor.execute("SELECT COALESCE(SUM(amount), 0) AS total FROM payments WHERE status = 'completed'")
+        row = cursor.fetchone()
     return float(row['total']) if row else 0.0
 
 
 def get_revenue_by_month(months=6):
     """Monthly revenue totals for the last N months."""
-    conn, cursor = get_db()
-    cursor.execute(
-        """SELECT TO_CHAR(DATE_TRUNC('month', payment_date), 'Mon YYYY') AS month,
-                  DATE_TRUNC('month', payment_date) AS month_date,
-                  COALESCE(SUM(amount), 0) AS revenue
-           FROM payments
-           WHERE status = 'completed'
-             AND payment_date >= CURRENT_DATE - (INTERVAL '1 month' * %s)
-           GROUP BY DATE_TRUNC('month', payment_date)
-           ORDER BY month_date ASC""",
-        (months,)
-    )
-    rows = [{'month': r['month'], 'revenue': float(r['revenue'])} for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
+    with db_transaction() as (conn, cursor):
+        cursor.execute(
+            """SELECT TO_CHAR(DATE_TRUNC('month', payment_date), 'Mon YYYY') AS month,
+                      DATE_TRUNC('month', payment_date) AS month_date,
+                      COALESCE(SUM(amount), 0) AS revenue
+               FROM payments
+               WHERE status = 'completed'
+                 AND payment_date >= CURRENT_DATE - (INTERVAL '1 month' * %s)
+               GROUP BY DATE_TRUNC('month', payment_date)
+               ORDER BY month_date ASC""",
+            (months,)
+        )
+        rows = [{'month': r['month'], 'revenue': float(r['revenue'])} for r in cursor.fetchall()]
     return rows
 
 
@@ -342,31 +335,37 @@ def get_revenue_by_month(months=6):
 # ADMIN USER FUNCTIONS
 # =====================================================================
 
+_ADMIN_USER_TIMESTAMPS = ('created_at', 'upgraded_at', 'cancelled_at',
+                          'subscription_expires_at', 'grace_period_ends_at',
+                          'last_login_at', 'last_activity_at')
+
+
 def get_all_users(limit=500):
     """All users for admin panel, newest first."""
-    conn, cursor = get_db()
-    cursor.execute(
-        '''SELECT id, email, plan_type, subscription_status, is_admin,
-                  billing_provider, billing_cycle, is_annual,
-                  subscription_id, cancel_at_period_end,
-                  subscription_expires_at, grace_period_ends_at,
-                  created_at, upgraded_at, cancelled_at,
-                  last_login_at, login_count, last_activity_at
-           FROM users
-           ORDER BY created_at DESC
-           LIMIT %s''',
-        (limit,)
-    )
-    rows = [dict(r) for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    for r in rows:
-        for col in ('created_at', 'upgraded_at', 'cancelled_at',
-                    'subscription_expires_at', 'grace_period_ends_at',
-                    'last_login_at', 'last_activity_at'):
-            if r.get(col):
-                r[col] = r[col].isoformat()
+    with db_transaction() as (conn, cursor):
+        cursor.execute(
+            '''SELECT id, email, plan_type, subscription_status, is_admin,
+                      billing_provider, billing_cycle, is_annual,
+                      subscription_id, cancel_at_period_end,
+                      subscription_expires_at, grace_period_ends_at,
+                      created_at, upgraded_at, cancelled_at,
+                      last_login_at, login_count, last_activity_at
+               FROM users
+               ORDER BY created_at DESC
+               LIMIT %s''',
+            (limit,)
+        )
+        # One pass over the cursor: RealDictRow is already a dict, so
+        # format the timestamps in place instead of copying every row first.
+        rows = []
+        for r in cursor:
+            for col in _ADMIN_USER_TIMESTAMPS:
+                if r[col]:
+                    r[col] = r[col].isoformat()
+            rows.append(r)
     return rows
+
+
 def record_agency_overage_seat(user_id: int, client_id: str, seat_num: int):
     """
     Record that a newly created client is an overage seat for an agency user.
@@ -163,6 +163,9 @@ def set_primary_contact(client_id, client_user_id):
                 (client_user_id, client_id)
             )
         conn.commit()
+        if updated:
+            from .clients import invalidate_client_cache
+            invalidate_client_cache(client_id)
         return updated
     except Exception:
         conn.rollback()
@@ -10,6 +10,7 @@ import secrets
 from datetime import datetime
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from .db import get_db
+from .jsonutil import json_dumps
 from .users import get_user_by_id
 from .migrations import init_db
 
@@ -71,7 +72,7 @@ def create_client(user_id, company_name, branding_settings=None, vertical=None):
                     widget_color, welcome_message, remove_branding)
                VALUES (%s, %s, %s, %s, %s, %s, %s)''',
             (user_id, client_id, company_name,
-             json.dumps(branding_settings),
+             json_dumps(branding_settings),
              primary_color, welcome_msg, remove_flag)
         )
         conn.commit()
@@ -273,6 +274,7 @@ def save_white_label_settings(client_id: str, domain: str | None,
         conn.commit()
         cursor.close()
         conn.close()
+        invalidate_client_cache(client_id)
     except Exception as e:
         import logging
         logging.getLogger(__name__).error(f"[save_white_label_settings] {e}")
@@ -337,7 +339,7 @@ def save_agency_branding(user_id: int, agency_branding: dict) -> None:
         conn, cursor = get_db()
         cursor.execute(
             "UPDATE users SET agency_branding_settings = %s WHERE id = %s",
-            (json.dumps(agency_branding), user_id)
+            (json_dumps(agency_branding), user_id)
         )
         conn.commit()
         cursor.close()
@@ -385,6 +387,66 @@ def get_client_by_id(client_id):
             except Exception: pass
 
 
+def get_clients_by_ids(client_ids):
+    """
+    Batch form of get_client_by_id for loops over rows from many clients
+    (the lead-reminder crons): one query instead of one per row.
+    Returns {client_id: client dict}; missing ids are simply absent, and a
+    DB error returns {}.
+    """
+    client_ids = list(set(client_ids))
+    if not client_ids:
+        return {}
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        cursor.execute('SELECT * FROM clients WHERE client_id = ANY(%s)', (client_ids,))
+        return {r['client_id']: dict(r) for r in cursor.fetchall()}
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f'[get_clients_by_ids] {e}')
+        return {}
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
+
+
+# Short-lived copy of the clients row for the chat widget, which re-reads
+# it on every message. Writes that matter to chat (branding/bot settings,
+# suspension, notification email, deletion) call invalidate_client_cache;
+# anything else is picked up when the entry expires.
+_client_row_cache: dict = {}
+_client_row_cache_lock = __import__('threading').Lock()
+_CLIENT_ROW_CACHE_TTL_SECONDS = 30
+
+
+def get_client_by_id_cached(client_id):
+    """get_client_by_id() behind a 30s in-process cache. Returns a fresh dict
+    each call so callers can't mutate the cached row. Misses aren't cached."""
+    import time
+    now = time.time()
+    with _client_row_cache_lock:
+        cached = _client_row_cache.get(client_id)
+        if cached and cached[1] > now:
+            return dict(cached[0])
+
+    client = get_client_by_id(client_id)
+    if client:
+        with _client_row_cache_lock:
+            _client_row_cache[client_id] = (dict(client), now + _CLIENT_ROW_CACHE_TTL_SECONDS)
+    return client
+
+
+def invalidate_client_cache(client_id):
+    """Drop client_id's cached row so the next chat message re-reads it."""
+    with _client_row_cache_lock:
+        _client_row_cache.pop(client_id, None)
+
+
 # In-process cache — client_id -> user_id rarely changes, and this is
 # called on every single chat message (utils.py cost-logging). A full
 # row fetch per message would be wasteful; client_id:owner pairs are
@@ -449,38 +511,53 @@ def verify_client_ownership(user_id, client_id):
             except Exception: pass
 
 
+# Tables holding per-client rows, deleted together with the client.
+# orders is here because it was missing entirely: this table holds
+# customer_email/customer_name (Shopify order data synced via
+# webhooks.py's _upsert_order) and had no FK relationship to clients
+# and wasn't in delete_client's list, meaning it survived account
+# deletion undetected. That's a real gap against this policy's own
+# "right to erasure" promise (privacy-policy.html section 16), not just
+# a Shopify-specific issue — found while building the retention system
+# tied to account lifecycle.
+_CLIENT_CHILD_TABLES = (
+    'conversations',
+    'leads',
+    'faqs',
+    # BUG-08 fix: orphaned tables that were previously missed
+    'knowledge_base',
+    'faq_embeddings',
+    'conversation_summaries',
+    'chat_sessions',
+    'kb_gaps',
+    'poor_answers',
+    'webhook_configs',
+    'webhook_logs',
+    'orders',
+)
+
+# One statement, one round trip. The child DELETEs run as data-modifying
+# CTEs; the FKs to clients are plain NO ACTION, which Postgres checks at
+# the end of the statement, so deleting the client row in the same
+# statement is safe.
+_DELETE_CLIENT_SQL = 'WITH {} DELETE FROM clients WHERE client_id = %(cid)s'.format(
+    ', '.join(
+        f'd_{table} AS (DELETE FROM {table} WHERE client_id = %(cid)s)'
+        for table in _CLIENT_CHILD_TABLES
+    )
+)
+
+
 def delete_client(client_id):
     """
-    Cascade-delete a client and all its associated data.
-    Order matters for FK constraints — client row must be last.
+    Cascade-delete a client and all its associated data in a single
+    statement (see _DELETE_CLIENT_SQL).
     """
     conn, cursor = get_db()
     try:
-        # FK-constrained tables first
-        cursor.execute('DELETE FROM conversations         WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM leads                 WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM faqs                  WHERE client_id = %s', (client_id,))
-        # BUG-08 fix: orphaned tables that were previously missed
-        cursor.execute('DELETE FROM knowledge_base        WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM faq_embeddings        WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM conversation_summaries WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM chat_sessions          WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM kb_gaps                WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM poor_answers           WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM webhook_configs        WHERE client_id = %s', (client_id,))
-        cursor.execute('DELETE FROM webhook_logs           WHERE client_id = %s', (client_id,))
-        # orders — added here because it was missing entirely: this table
-        # holds customer_email/customer_name (Shopify order data synced via
-        # webhooks.py's _upsert_order) and had no FK relationship to clients
-        # and wasn't in this function's DELETE list, meaning it survived
-        # account deletion undetected. That's a real gap against this
-        # policy's own "right to erasure" promise (privacy-policy.html
-        # section 16), not just a Shopify-specific issue — found while
-        # building the retention system tied to account lifecycle.
-        cursor.execute('DELETE FROM orders                 WHERE client_id = %s', (client_id,))
-        # Client row last
-        cursor.execute('DELETE FROM clients               WHERE client_id = %s', (client_id,))
+        cursor.execute(_DELETE_CLIENT_SQL, {'cid': client_id})
         conn.commit()
+        invalidate_client_cache(client_id)
     except Exception:
         conn.rollback()
         raise
@@ -500,6 +577,7 @@ def toggle_client_suspended(client_id: str, suspend: bool) -> bool:
         conn.commit()
         cursor.close()
         conn.close()
+        invalidate_client_cache(client_id)
         return True
     except Exception as e:
         import logging
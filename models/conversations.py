@@ -4,29 +4,33 @@ models/conversations.py
 Conversation logging, daily message counting, client owner lookup,
 conversation history retrieval, and summary storage.
 """
-from datetime import datetime
 from .db import get_db
 
 def get_daily_message_count(client_id):
     """
-    Return the number of chat messages logged for this client today (UTC).
+    Return the number of chat messages logged for this client today.
     Excludes lead_captured rows — those are lead form submissions, not chat
     turns, and should not count against the messages_per_day plan limit.
     Fails open (returns 0) if the DB is unavailable so chat is never
     blocked by an infrastructure hiccup.
+
+    Filters on a [CURRENT_DATE, CURRENT_DATE + 1) range rather than
+    DATE(timestamp) so idx_conversations_client_ts can serve it. The day
+    boundary comes from the database clock, the same one that stamps
+    conversations.timestamp and that log_conversation's capped INSERT
+    counts against.
     """
     try:
         conn, cursor = get_db()
-        today = datetime.utcnow().strftime('%Y-%m-%d')
         cursor.execute(
             '''
             SELECT COUNT(*) AS cnt
             FROM conversations
             WHERE client_id = %s
-              AND DATE(timestamp) = %s
+              AND timestamp >= CURRENT_DATE AND timestamp < CURRENT_DATE + 1
               AND (method IS NULL OR method != 'lead_captured')
             ''',
-            (client_id, today)
+            (client_id,)
         )
         row = cursor.fetchone() or {}
         cursor.close()
@@ -38,7 +42,7 @@ def get_daily_message_count(client_id):
 
 def get_daily_conversation_stats(client_id):
     """
-    Return {'total': N, 'matched': N} for this client today (UTC) — the
+    Return {'total': N, 'matched': N} for this client today — the
     data behind the dashboard's "Conversations Today" and "AI Resolution
     Rate" cards. Same scope/exclusions as get_daily_message_count (right
     above), just also splits out the matched subset in one query instead
@@ -46,7 +50,6 @@ def get_daily_conversation_stats(client_id):
     """
     try:
         conn, cursor = get_db()
-        today = datetime.utcnow().strftime('%Y-%m-%d')
         cursor.execute(
             '''
             SELECT
@@ -54,10 +57,10 @@ def get_daily_conversation_stats(client_id):
                 COUNT(*) FILTER (WHERE matched) AS matched
             FROM conversations
             WHERE client_id = %s
-              AND DATE(timestamp) = %s
+              AND timestamp >= CURRENT_DATE AND timestamp < CURRENT_DATE + 1
               AND (method IS NULL OR method != 'lead_captured')
             ''',
-            (client_id, today)
+            (client_id,)
         )
         row = cursor.fetchone() or {}
         cursor.close()
@@ -113,25 +116,25 @@ def get_client_owner(client_id):
     Used by plan enforcement helpers in app.py.
     Returns None if client or user not found.
     """
+    conn = cursor = None
     try:
         conn, cursor = get_db()
         cursor.execute(
-            'SELECT user_id FROM clients WHERE client_id = %s',
+            'SELECT u.* FROM users u JOIN clients c ON c.user_id = u.id '
+            'WHERE c.client_id = %s',
             (client_id,)
         )
-        row = cursor.fetchone()
-        if not row:
-            cursor.close()
-            conn.close()
-            return None
-        user_id = row['user_id']
-        cursor.execute('SELECT * FROM users WHERE id = %s', (user_id,))
         user = cursor.fetchone()
-        cursor.close()
-        conn.close()
         return dict(user) if user else None
     except Exception:
         return None
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
 
 
 # =====================================================================
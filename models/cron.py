@@ -63,13 +63,15 @@ def get_cron_history(job_name: str, limit: int = 20) -> list:
 
 def prune_old_logs(webhook_days: int = 60) -> dict:
     """
-    Delete old webhook_logs rows to keep the DB lean.
+    Delete old webhook_logs rows to keep the DB lean, plus inbound
+    idempotency_keys older than 7 days (providers stop retrying well
+    before that).
     Conversations are intentionally kept forever — they are used as
     LLM fine-tuning training data and must never be auto-pruned.
     Returns counts of deleted rows.
     Safe — uses explicit WHERE clause with age guard.
     """
-    deleted = {'webhook_logs': 0}
+    deleted = {'webhook_logs': 0, 'idempotency_keys': 0}
     try:
         conn, cursor = get_db()
         cursor.execute(
@@ -78,6 +80,14 @@ def prune_old_logs(webhook_days: int = 60) -> dict:
         )
         deleted['webhook_logs'] = cursor.rowcount
         conn.commit()
+        try:
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE created_at < NOW() - INTERVAL '7 days'"
+            )
+            deleted['idempotency_keys'] = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()   # table not migrated yet — webhook_logs prune already committed
         cursor.close()
         conn.close()
     except Exception as e:
@@ -1,11 +1,13 @@
 """
 models/db.py
 ------------
-Connection pool, _PooledConn wrapper, get_db(), get_db_connection().
+Connection pool, _PooledConn wrapper, get_db(), get_db_connection(),
+db_transaction().
 Every other models sub-module imports get_db from here — nothing else.
 """
 import psycopg2
 import psycopg2.extras
+from contextlib import contextmanager
 import bcrypt
 import secrets
 from datetime import datetime
@@ -20,6 +22,44 @@ if not DATABASE_URL:
         "Add it to your Render/local .env before starting the server."
     )
 
+# ── Cooperative waits under gevent ────────────────────────────────────
+# Production runs one gunicorn gevent worker (see Procfile). gevent's
+# monkey-patching makes Python sockets — requests/httpx calls to Gemini,
+# Claude, PayPal, Shopify — yield to other greenlets while they wait, but
+# psycopg2 talks to Postgres through libpq in C, so every query blocked
+# the whole worker until it returned. Registering a wait callback makes
+# libpq hand control back to the gevent hub while a query is in flight,
+# the same thing psycogreen does. Outside gevent (scripts, flask run)
+# nothing is registered and psycopg2 keeps its normal blocking behaviour.
+
+def _gevent_wait_callback(conn, timeout=None):
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def _install_gevent_wait_callback():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    if not monkey.is_module_patched('socket'):
+        return False
+    psycopg2.extensions.set_wait_callback(_gevent_wait_callback)
+    return True
+
+
+_install_gevent_wait_callback()
+
+
 # ── Connection pool ───────────────────────────────────────────────────
 # Opens at most (maxconn) connections to Postgres. Every call to get_db()
 # checks out one connection from the pool and every caller must return it
@@ -152,3 +192,30 @@ def get_db_connection():
     cursor.close()
     return conn
 
+
+@contextmanager
+def db_transaction():
+    """
+    `with db_transaction() as (conn, cursor):` — borrow a pooled connection
+    for one unit of work. Commits on a clean exit, rolls back if the block
+    raises (the exception still propagates), and always returns the
+    connection to the pool. Replaces the hand-written
+    try/commit/except-rollback/finally-close ladder for new call sites.
+    """
+    conn, cursor = get_db()
+    try:
+        yield conn, cursor
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
@@ -8,8 +8,12 @@ import json
 import re
 import uuid
 from datetime import datetime
+from psycopg2.extras import execute_values
+
 from .db import get_db
 
+from .jsonutil import json_dumps as _json_dumps, json_loads as _json_loads
+
 def _extract_keywords(text: str, limit: int = 8) -> list:
     """Simple keyword extractor — used when ai_helper is unavailable."""
     import re
@@ -236,79 +240,84 @@ def save_faqs(client_id: str, faqs: list) -> int:
     if not faqs:
         return 0
 
+    # Strip null bytes (0x00) that arrive from PDF/binary uploads
+    # and cause "ValueError: A string literal cannot contain NUL characters"
+    def _clean(val: str) -> str:
+        return str(val).replace('\x00', '').strip()
+
+    # Keyed by faq_id: one multi-row ON CONFLICT DO UPDATE can't touch the
+    # same row twice, so a repeated id keeps its last occurrence — the same
+    # end state the old one-INSERT-per-FAQ loop left behind.
+    rows = {}
+    for faq in faqs:
+        faq_id = str(faq.get('id') or faq.get('faq_id') or uuid.uuid4())
+
+        # ── Normalise triggers ────────────────────────────────────
+        triggers = faq.get('triggers', [])
+        if isinstance(triggers, str):
+            try:
+                triggers = json.loads(triggers)
+            except Exception:
+                triggers = [t.strip() for t in triggers.split(',') if t.strip()]
+        if not isinstance(triggers, list):
+            triggers = []
+
+        # ── Normalise tags (same pattern as triggers) ─────────────
+        tags = faq.get('tags', [])
+        if isinstance(tags, str):
+            try:
+                tags = json.loads(tags)
+            except Exception:
+                tags = [t.strip() for t in tags.split(',') if t.strip()]
+        if not isinstance(tags, list):
+            tags = []
+
+        # ── Normalise embedding ───────────────────────────────────
+        embedding = faq.get('embedding')
+        if isinstance(embedding, list):
+            embedding_js = _json_dumps(embedding)
+        elif isinstance(embedding, str) and embedding.startswith('['):
+            embedding_js = embedding      # already a valid JSON string
+        else:
+            embedding_js = None           # no embedding — DB will keep existing
+
+        quality = float(faq.get('quality_score', 0.0))
+
+        rows[faq_id] = (
+            client_id, faq_id,
+            _clean(faq.get('question', '')),
+            _clean(faq.get('answer', '')),
+            faq.get('category', 'General'),
+            _json_dumps(triggers),
+            _json_dumps(tags),
+            quality,
+            embedding_js,
+            True,
+        )
+
     conn, cursor = get_db()
-    saved = 0
     try:
-        for faq in faqs:
-            faq_id = str(faq.get('id') or faq.get('faq_id') or uuid.uuid4())
-
-            # ── Normalise triggers ────────────────────────────────────
-            triggers = faq.get('triggers', [])
-            if isinstance(triggers, str):
-                try:
-                    triggers = json.loads(triggers)
-                except Exception:
-                    triggers = [t.strip() for t in triggers.split(',') if t.strip()]
-            if not isinstance(triggers, list):
-                triggers = []
-
-            # ── Normalise tags (same pattern as triggers) ─────────────
-            tags = faq.get('tags', [])
-            if isinstance(tags, str):
-                try:
-                    tags = json.loads(tags)
-                except Exception:
-                    tags = [t.strip() for t in tags.split(',') if t.strip()]
-            if not isinstance(tags, list):
-                tags = []
-
-            # ── Normalise embedding ───────────────────────────────────
-            embedding = faq.get('embedding')
-            if isinstance(embedding, list):
-                embedding_js = json.dumps(embedding)
-            elif isinstance(embedding, str) and embedding.startswith('['):
-                embedding_js = embedding      # already a valid JSON string
-            else:
-                embedding_js = None           # no embedding — DB will keep existing
-
-            quality = float(faq.get('quality_score', 0.0))
-
-            # Strip null bytes (0x00) that arrive from PDF/binary uploads
-            # and cause "ValueError: A string literal cannot contain NUL characters"
-            def _clean(val: str) -> str:
-                return str(val).replace('\x00', '').strip()
-
-            cursor.execute(
-                """INSERT INTO faqs
-                       (client_id, faq_id, question, answer, category,
-                        triggers, tags, quality_score, embedding, is_active)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                   ON CONFLICT (faq_id) DO UPDATE SET
-                       question      = EXCLUDED.question,
-                       answer        = EXCLUDED.answer,
-                       category      = EXCLUDED.category,
-                       triggers      = EXCLUDED.triggers,
-                       tags          = EXCLUDED.tags,
-                       quality_score = EXCLUDED.quality_score,
-                       embedding     = COALESCE(EXCLUDED.embedding,   faqs.embedding),
-                       last_indexed  = COALESCE(faqs.last_indexed, EXCLUDED.last_indexed),
-                       is_active     = TRUE""",
-                (
-                    client_id, faq_id,
-                    _clean(faq.get('question', '')),
-                    _clean(faq.get('answer', '')),
-                    faq.get('category', 'General'),
-                    json.dumps(triggers),
-                    json.dumps(tags),
-                    quality,
-                    embedding_js,
-                    True,
-                )
-            )
-            saved += 1
-
+        execute_values(
+            cursor,
+            """INSERT INTO faqs
+                   (client_id, faq_id, question, answer, category,
+                    triggers, tags, quality_score, embedding, is_active)
+               VALUES %s
+               ON CONFLICT (faq_id) DO UPDATE SET
+                   question      = EXCLUDED.question,
+                   answer        = EXCLUDED.answer,
+                   category      = EXCLUDED.category,
+                   triggers      = EXCLUDED.triggers,
+                   tags          = EXCLUDED.tags,
+                   quality_score = EXCLUDED.quality_score,
+                   embedding     = COALESCE(EXCLUDED.embedding,   faqs.embedding),
+                   last_indexed  = COALESCE(faqs.last_indexed, EXCLUDED.last_indexed),
+                   is_active     = TRUE""",
+            list(rows.values()),
+            page_size=500,
+        )
         conn.commit()
-        return saved
+        return len(faqs)
     except Exception as e:
         conn.rollback()
         raise e
@@ -325,8 +334,13 @@ def get_faqs(client_id: str, active_only: bool = True) -> list:
     conn, cursor = get_db()
     try:
         where = "client_id = %s AND is_active = TRUE" if active_only else "client_id = %s"
+        # Only the columns the result dict below is built from — this runs on
+        # every chat turn, and client_id/created_at/is_active are dead weight.
         cursor.execute(
-            f"SELECT * FROM faqs WHERE {where} ORDER BY quality_score DESC, created_at DESC",
+            f"""SELECT id, faq_id, question, answer, category, triggers, tags,
+                       quality_score, embedding, last_indexed
+                FROM faqs WHERE {where}
+                ORDER BY quality_score DESC, created_at DESC""",
             (client_id,)
         )
         rows = cursor.fetchall()
@@ -342,14 +356,14 @@ def get_faqs(client_id: str, active_only: bool = True) -> list:
             triggers = triggers_raw
         else:
             try:
-                triggers = json.loads(triggers_raw)
+                triggers = _json_loads(triggers_raw)
             except Exception:
                 triggers = [t.strip() for t in triggers_raw.split(',') if t.strip()]
 
         # Parse tags
         tags_raw = faq.get('tags', '[]') or '[]'
         try:
-            tags = json.loads(tags_raw) if isinstance(tags_raw, str) else tags_raw
+            tags = _json_loads(tags_raw) if isinstance(tags_raw, str) else tags_raw
         except Exception:
             tags = []
 
@@ -357,7 +371,7 @@ def get_faqs(client_id: str, active_only: bool = True) -> list:
         embedding_raw = faq.get('embedding')
         if embedding_raw and isinstance(embedding_raw, str):
             try:
-                embedding_parsed = json.loads(embedding_raw)
+                embedding_parsed = _json_loads(embedding_raw)
             except Exception:
                 embedding_parsed = []
         elif isinstance(embedding_raw, list):
@@ -0,0 +1,35 @@
+"""
+models/jsonutil.py
+------------------
+json_dumps() / json_loads() for the JSON-in-TEXT columns (embeddings,
+branding_settings, custom_fields, analytics metadata).
+
+Uses orjson when installed — embeddings are hundreds of floats each and
+are encoded on every save and decoded on every chat turn. Falls back to
+stdlib json if orjson is missing, and per call for anything orjson
+refuses (e.g. ints wider than 64 bits), so callers see stdlib behaviour.
+"""
+import json
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+def json_dumps(obj) -> str:
+    """Serialize obj to a JSON string for a TEXT column."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj, option=_orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj)
+
+
+if _orjson is not None:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing
+    # except clauses keep working.
+    json_loads = _orjson.loads
+else:
+    json_loads = json.loads
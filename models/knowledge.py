@@ -4,9 +4,9 @@ models/knowledge.py
 Knowledge base chunk storage, embedding storage and retrieval,
 and semantic search helpers.
 """
-import json
 import uuid
 from .db import get_db
+from .jsonutil import json_dumps, json_loads
 
 def get_latest_conversation_summary(client_id: str) -> str:
     """Return the most recent summary string, or empty string if none."""
@@ -35,7 +35,7 @@ def store_faq_embedding(client_id: str, faq_id: str, question: str, embedding: l
     """
     if not embedding:
         return
-    emb_json = json.dumps(embedding)
+    emb_json = json_dumps(embedding)
     try:
         conn, cursor = get_db()
         # Primary store: faq_embeddings table
@@ -79,7 +79,7 @@ def get_faq_embeddings(client_id: str) -> list:
             {
                 'faq_id':    r['faq_id'],
                 'question':  r['question'],
-                'embedding': json.loads(r['embedding'])
+                'embedding': json_loads(r['embedding'])
             }
             for r in rows
         ]
@@ -114,12 +114,12 @@ def get_knowledge_chunks(client_id: str, chunk_type: str = None, limit: int = 50
             for field in ('tags', 'metadata'):
                 if r.get(field) and isinstance(r[field], str):
                     try:
-                        r[field] = json.loads(r[field])
+                        r[field] = json_loads(r[field])
                     except Exception:
                         r[field] = []
             if r.get('embedding') and isinstance(r['embedding'], str):
                 try:
-                    r['embedding'] = json.loads(r['embedding'])
+                    r['embedding'] = json_loads(r['embedding'])
                 except Exception:
                     r['embedding'] = None
             # ai_helper reads chunk.get('kb_id') — alias chunk_id so it resolves correctly
@@ -183,14 +183,14 @@ def store_embedding(client_id: str, chunk_id: str = None, embedding: list = None
             cursor.execute(
                 '''UPDATE knowledge_base SET embedding = %s, updated_at = CURRENT_TIMESTAMP
                    WHERE client_id = %s AND chunk_id = %s''',
-                (json.dumps(embedding), client_id, chunk_id)
+                (json_dumps(embedding), client_id, chunk_id)
             )
             updated = cursor.rowcount
         if not updated and kb_id:
             cursor.execute(
                 '''UPDATE knowledge_base SET embedding = %s, updated_at = CURRENT_TIMESTAMP
                    WHERE client_id = %s AND kb_id = %s''',
-                (json.dumps(embedding), client_id, kb_id)
+                (json_dumps(embedding), client_id, kb_id)
             )
         conn.commit()
     except Exception as e:
@@ -219,7 +219,7 @@ def get_embeddings_for_client(client_id: str) -> list:
             {
                 'chunk_id':  r['cid'],
                 'kb_id':     r['kid'],
-                'embedding': json.loads(r['embedding']),
+                'embedding': json_loads(r['embedding']),
             }
             for r in rows
         ]
@@ -281,9 +281,9 @@ def save_knowledge_chunks(client_id: str, chunks: list) -> int:
                     chunk.get('content', ''),
                     chunk.get('type', 'faq'),
                     chunk.get('category', 'General'),
-                    json.dumps(chunk.get('tags', [])),
-                    json.dumps(chunk.get('embedding', [])) if chunk.get('embedding') else None,
-                    json.dumps(chunk.get('metadata', {})),
+                    json_dumps(chunk.get('tags', [])),
+                    json_dumps(chunk.get('embedding', [])) if chunk.get('embedding') else None,
+                    json_dumps(chunk.get('metadata', {})),
                     float(chunk.get('quality', 0.8)),
                 )
             )
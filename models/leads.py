@@ -8,6 +8,7 @@ import json
 import uuid
 from datetime import datetime
 from .db import get_db
+from .jsonutil import json_dumps
 
 def save_lead(client_id, lead_data):
     """
@@ -24,7 +25,7 @@ def save_lead(client_id, lead_data):
         # Serialize custom_fields dict to JSON string for TEXT column
         custom_fields = lead_data.get('custom_fields')
         if isinstance(custom_fields, dict):
-            custom_fields = json.dumps(custom_fields)
+            custom_fields = json_dumps(custom_fields)
 
         cursor.execute(
             'SELECT id FROM leads WHERE client_id = %s AND LOWER(email) = LOWER(%s)',
@@ -175,7 +176,7 @@ def update_lead(client_id, lead_id, updates: dict):
             # permanently block any reminder after the very first one ever sent.
             set_clauses += ", followup_reminder_sent_at = NULL"
         set_clauses += ", activity_log = %s, updated_at = NOW()"
-        values = list(clean.values()) + [json.dumps(existing_log), lead_id, client_id]
+        values = list(clean.values()) + [json_dumps(existing_log), lead_id, client_id]
 
         cursor.execute(
             f"UPDATE leads SET {set_clauses} WHERE id = %s AND client_id = %s",
@@ -251,7 +252,7 @@ def bulk_update_leads(client_id, lead_ids: list, updates: dict, actor: str = 'sy
             })
             set_clauses = ', '.join(f"{k} = %s" for k in clean)
             set_clauses += ", activity_log = %s, updated_at = NOW()"
-            values = list(clean.values()) + [json.dumps(existing_log), lead_id, client_id]
+            values = list(clean.values()) + [json_dumps(existing_log), lead_id, client_id]
             cursor.execute(
                 f"UPDATE leads SET {set_clauses} WHERE id = %s AND client_id = %s",
                 values
@@ -269,64 +270,133 @@ def bulk_update_leads(client_id, lead_ids: list, updates: dict, actor: str = 'sy
         conn.close()
 
 
-def get_leads(client_id, stage=None, search=None):
+def _leads_filter(client_id, stage=None, search=None):
+    """WHERE clause + params shared by get_leads / count_leads / iter_leads."""
+    where  = "client_id = %s"
+    params = [client_id]
+    if stage:
+        where += " AND COALESCE(stage, 'new') = %s"
+        params.append(stage)
+    if search:
+        term   = '%' + search + '%'
+        where += " AND (name ILIKE %s OR email ILIKE %s OR company ILIKE %s)"
+        params.extend([term, term, term])
+    return where, params
+
+
+def _serialize_lead(lead):
+    row = dict(lead)
+    # Serialize datetime fields so JSON / frontend fmtDate() works
+    if row.get('created_at'):
+        row['created_at'] = row['created_at'].isoformat()
+    if row.get('updated_at'):
+        row['updated_at'] = row['updated_at'].isoformat()
+    if row.get('follow_up_at'):
+        row['follow_up_at'] = row['follow_up_at'].isoformat()
+    if row.get('closed_value') is not None:
+        row['closed_value'] = float(row['closed_value'])
+    # Deserialize custom_fields back to dict if stored as JSON string
+    if row.get('custom_fields') and isinstance(row['custom_fields'], str):
+        try:
+            row['custom_fields'] = json.loads(row['custom_fields'])
+        except Exception:
+            pass
+    # Deserialize activity_log back to list
+    if row.get('activity_log') and isinstance(row['activity_log'], str):
+        try:
+            row['activity_log'] = json.loads(row['activity_log'])
+        except Exception:
+            row['activity_log'] = []
+    # Default stage for legacy rows that pre-date the migration
+    if not row.get('stage'):
+        row['stage'] = 'new'
+    return row
+
+
+def get_leads(client_id, stage=None, search=None, limit=None, offset=None):
     """
     Get leads for a client, newest first.
     stage  — filter to a single pipeline stage (SQL-side, COALESCE handles legacy NULLs)
     search — case-insensitive substring match on name, email, or company (SQL ILIKE)
+    limit  — cap the row count in SQL (callers that only need the newest N)
+    offset — skip this many rows first (pagination; pair with count_leads)
     Returns [] on failure.
     """
     try:
         conn, cursor = get_db()
-        query  = "SELECT * FROM leads WHERE client_id = %s"
-        params = [client_id]
-        if stage:
-            query += " AND COALESCE(stage, 'new') = %s"
-            params.append(stage)
-        if search:
-            term   = '%' + search + '%'
-            query += " AND (name ILIKE %s OR email ILIKE %s OR company ILIKE %s)"
-            params.extend([term, term, term])
-        query += " ORDER BY created_at DESC"
+        where, params = _leads_filter(client_id, stage, search)
+        query = f"SELECT * FROM leads WHERE {where} ORDER BY created_at DESC"
+        if limit:
+            query += " LIMIT %s"
+            params.append(int(limit))
+        if offset:
+            query += " OFFSET %s"
+            params.append(int(offset))
         cursor.execute(query, params)
         leads = cursor.fetchall()
         cursor.close()
         conn.close()
-        result = []
-        for lead in leads:
-            row = dict(lead)
-            # Serialize datetime fields so JSON / frontend fmtDate() works
-            if row.get('created_at'):
-                row['created_at'] = row['created_at'].isoformat()
-            if row.get('updated_at'):
-                row['updated_at'] = row['updated_at'].isoformat()
-            if row.get('follow_up_at'):
-                row['follow_up_at'] = row['follow_up_at'].isoformat()
-            if row.get('closed_value') is not None:
-                row['closed_value'] = float(row['closed_value'])
-            # Deserialize custom_fields back to dict if stored as JSON string
-            if row.get('custom_fields') and isinstance(row['custom_fields'], str):
-                try:
-                    row['custom_fields'] = json.loads(row['custom_fields'])
-                except Exception:
-                    pass
-            # Deserialize activity_log back to list
-            if row.get('activity_log') and isinstance(row['activity_log'], str):
-                try:
-                    row['activity_log'] = json.loads(row['activity_log'])
-                except Exception:
-                    row['activity_log'] = []
-            # Default stage for legacy rows that pre-date the migration
-            if not row.get('stage'):
-                row['stage'] = 'new'
-            result.append(row)
-        return result
+        return [_serialize_lead(lead) for lead in leads]
     except Exception as e:
         import logging
         logging.getLogger(__name__).error(f"[get_leads] {e}")
         return []
 
 
+def count_leads(client_id, stage=None, search=None):
+    """Number of leads get_leads() would return unpaginated. 0 on failure."""
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        where, params = _leads_filter(client_id, stage, search)
+        cursor.execute(f"SELECT COUNT(*) AS cnt FROM leads WHERE {where}", params)
+        row = cursor.fetchone() or {}
+        return int(row.get('cnt', 0))
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f"[count_leads] {e}")
+        return 0
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
+
+
+def iter_leads(client_id, stage=None, search=None, batch_size=1000):
+    """
+    Yield every matching lead (same shape and order as get_leads) through a
+    server-side cursor, batch_size rows per round-trip — for CSV export, so
+    memory stays flat however many leads a client has. The pooled connection
+    is held until the generator is exhausted or closed. Stops early (after
+    logging) on a DB error rather than raising into a half-sent response.
+    """
+    conn = cursor = None
+    try:
+        conn, plain = get_db()
+        plain.close()
+        where, params = _leads_filter(client_id, stage, search)
+        cursor = conn.cursor(name='leads_export')
+        cursor.itersize = batch_size
+        cursor.execute(f"SELECT * FROM leads WHERE {where} ORDER BY created_at DESC", params)
+        for lead in cursor:
+            yield _serialize_lead(lead)
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f"[iter_leads] {e}")
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.rollback()   # end the read transaction the named cursor lives in
+            except Exception: pass
+            try: conn.close()
+            except Exception: pass
+
+
 # =====================================================================
 # AFFILIATE FUNCTIONS
 # =====================================================================
@@ -12,9 +12,11 @@ from .db import get_db
 
 def init_db():
     """Initialize database with tables"""
-    conn, cursor = get_db()
+    # Every CREATE below is collected and sent as one multi-statement
+    # execute — one round trip on cold start instead of one per table.
+    ddl = []
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS users (
             id SERIAL PRIMARY KEY,
             email TEXT UNIQUE NOT NULL,
@@ -24,7 +26,7 @@ def init_db():
         )
     ''')
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS clients (
             id SERIAL PRIMARY KEY,
             user_id INTEGER NOT NULL,
@@ -39,7 +41,7 @@ def init_db():
         )
     ''')
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS faqs (
             id SERIAL PRIMARY KEY,
             client_id TEXT NOT NULL,
@@ -53,7 +55,7 @@ def init_db():
         )
     ''')
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS leads (
             id SERIAL PRIMARY KEY,
             client_id TEXT NOT NULL,
@@ -70,7 +72,7 @@ def init_db():
         )
     ''')
 
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS conversations (
             id           SERIAL      PRIMARY KEY,
             client_id    TEXT        NOT NULL,
@@ -88,12 +90,12 @@ def init_db():
             FOREIGN KEY (client_id) REFERENCES clients (client_id)
         )
     ''')
-    cursor.execute(
+    ddl.append(
         "CREATE INDEX IF NOT EXISTS idx_conversations_client_session "
         "ON conversations (client_id, session_id) WHERE session_id IS NOT NULL"
     )
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS affiliates (
             id SERIAL PRIMARY KEY,
             user_id INTEGER NOT NULL,
@@ -110,7 +112,7 @@ def init_db():
         )
     ''')
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS referrals (
             id SERIAL PRIMARY KEY,
             affiliate_id INTEGER NOT NULL,
@@ -124,7 +126,7 @@ def init_db():
         )
     ''')
     
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS commissions (
             id SERIAL PRIMARY KEY,
             affiliate_id INTEGER NOT NULL,
@@ -141,7 +143,7 @@ def init_db():
     ''')
 
     # Payments table
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS payments (
             id SERIAL PRIMARY KEY,
             user_id INTEGER NOT NULL,
@@ -156,7 +158,7 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS analytics_events (
             id SERIAL PRIMARY KEY,
             user_id INTEGER,
@@ -166,7 +168,7 @@ def init_db():
         )
     ''')
 
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS articles (
             id SERIAL PRIMARY KEY,
             client_id TEXT NOT NULL,
@@ -179,7 +181,7 @@ def init_db():
         )
     ''')
 
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS client_users (
             id SERIAL PRIMARY KEY,
             client_id TEXT NOT NULL,
@@ -195,7 +197,7 @@ def init_db():
 
     # kb_gaps — unanswered question tracker (was incorrectly created per-request
     # inside record_kb_gap; moved here so the DDL runs exactly once at startup)
-    cursor.execute('''
+    ddl.append('''
         CREATE TABLE IF NOT EXISTS kb_gaps (
             id          SERIAL PRIMARY KEY,
             client_id   TEXT NOT NULL,
@@ -208,6 +210,8 @@ def init_db():
         )
     ''')
 
+    conn, cursor = get_db()
+    cursor.execute(';\n'.join(ddl))
     conn.commit()
     cursor.close()
     conn.close()
@@ -245,6 +249,12 @@ def init_db():
     migrate_agency_email_domains()      # white-label custom email domain per agency
     migrate_seat_subscriptions()        # agency per-seat purchase subscriptions
 
+    # ── Query indexes ───────────────────────────────────────────────────────
+    # leads (client_id, created_at) also serves get_leads()' newest-first
+    # LIMIT scans — Postgres walks a btree backwards, so no DESC variant.
+    migrate_analytics_indexes()         # conversations/leads client+time indexes
+    migrate_lookup_indexes()            # FK-column indexes behind the per-request lookups
+
 
 def migrate_clients_table():
     """One-time schema migration for the clients table."""
@@ -2420,3 +2430,149 @@ def migrate_admin_activity_tracking():
         if conn:
             try: conn.close()
             except Exception: pass
+
+
+def migrate_analytics_indexes():
+    """
+    Composite indexes for the per-client time-range queries behind the
+    analytics page (blueprints/agency.py get_analytics): the timeline's
+    GROUP BY DATE(...) and the window counts all filter on client_id plus
+    a timestamp lower bound, which is a full-table scan without these.
+    The top/unanswered question lists additionally pin `matched`, so they
+    get their own (client_id, matched, timestamp) range. user_message is
+    deliberately not indexed: it's unbounded free text and a long message
+    would overflow the btree tuple limit and fail the INSERT.
+
+    The first time an index is created its table is ANALYZEd so the
+    planner has fresh statistics straight away; on later startups every
+    index already exists and autovacuum keeps the statistics current.
+
+    Idempotent — safe to run on every startup/migrate click.
+    """
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        indexes = (
+            ('idx_conversations_client_ts',         'conversations', '(client_id, timestamp)'),
+            ('idx_conversations_client_matched_ts', 'conversations', '(client_id, matched, timestamp)'),
+            ('idx_leads_client_created',            'leads',         '(client_id, created_at)'),
+        )
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)",
+            ([name for name, _, _ in indexes],)
+        )
+        existing = {row['indexname'] for row in cursor.fetchall()}
+        to_analyze = []
+        for name, table, columns in indexes:
+            if name in existing:
+                continue
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}")
+            if table not in to_analyze:
+                to_analyze.append(table)
+        for table in to_analyze:
+            cursor.execute(f"ANALYZE {table}")
+        conn.commit()
+        print("✅ migrate_analytics_indexes complete")
+    except Exception as e:
+        if conn:
+            try: conn.rollback()
+            except Exception: pass
+        print(f"⚠️  migrate_analytics_indexes: {e}")
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
+
+
+def migrate_lookup_indexes():
+    """
+    Plain btree indexes on the non-unique FK columns the model helpers filter
+    by on every request: get_user_clients (clients.user_id), get_faqs
+    (faqs.client_id), get_affiliate_by_user_id (affiliates.user_id) and the
+    referral/commission rollups in get_affiliate_stats. Postgres only indexes
+    the referenced side of a foreign key, so each of these was a seq scan.
+    payments (status, payment_date) serves the admin revenue queries
+    (get_mrr, get_total_revenue, get_revenue_by_month), which all filter on
+    status = 'completed' plus a payment_date range. users (created_at) does
+    the same for the signup-growth cards (get_new_users_this_month,
+    get_user_growth_by_month). leads (created_at DESC) lets the admin
+    all-leads view (get_all_leads_admin: newest 500 across every client)
+    walk the index instead of sorting the whole table.
+    conversations/leads are covered by migrate_analytics_indexes;
+    clients.client_id and password_reset_tokens.token are UNIQUE and so
+    already indexed.
+
+    Idempotent — safe to run on every startup/migrate click.
+    """
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        for stmt in (
+            "CREATE INDEX IF NOT EXISTS idx_clients_user ON clients (user_id)",
+            "CREATE INDEX IF NOT EXISTS idx_faqs_client ON faqs (client_id)",
+            "CREATE INDEX IF NOT EXISTS idx_affiliates_user ON affiliates (user_id)",
+            "CREATE INDEX IF NOT EXISTS idx_referrals_affiliate ON referrals (affiliate_id)",
+            "CREATE INDEX IF NOT EXISTS idx_commissions_affiliate_status "
+            "ON commissions (affiliate_id, status)",
+            "CREATE INDEX IF NOT EXISTS idx_payments_status_date "
+            "ON payments (status, payment_date)",
+            "CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_leads_created ON leads (created_at DESC)",
+        ):
+            cursor.execute(stmt)
+        conn.commit()
+        print("✅ migrate_lookup_indexes complete")
+    except Exception as e:
+        if conn:
+            try: conn.rollback()
+            except Exception: pass
+        print(f"⚠️  migrate_lookup_indexes: {e}")
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
+
+
+def migrate_idempotency_keys():
+    """
+    idempotency_keys — one row per inbound webhook delivery we've already
+    acted on. Handlers claim a key with INSERT ... ON CONFLICT DO NOTHING
+    (models.claim_idempotency_key), so two concurrent retries of the same
+    event can't both get past the check the way a SELECT-then-INSERT can.
+    Pruned after 7 days by /cron/cleanup-logs.
+
+    Idempotent — safe to run on every startup/migrate click.
+    """
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key         TEXT PRIMARY KEY,
+                created_at  TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created "
+            "ON idempotency_keys (created_at)"
+        )
+        conn.commit()
+        print("✅ migrate_idempotency_keys complete")
+    except Exception as e:
+        if conn:
+            try: conn.rollback()
+            except Exception: pass
+        print(f"⚠️  migrate_idempotency_keys: {e}")
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
@@ -5,10 +5,51 @@ User creation, authentication, profile management, password reset,
 Google OAuth linking, and onboarding completion.
 """
 import bcrypt
+import os
 import secrets
 import uuid
 from datetime import datetime
-from .db import get_db
+from .db import db_transaction, get_db
+
+# bcrypt work factor for real passwords. 12 (the library default) is
+# ~250ms of CPU per hash; BCRYPT_ROUNDS lets a deploy trade that down on
+# slow hosts (OWASP floor is 10). Existing hashes keep verifying at
+# whatever cost they were created with — it's embedded in the hash.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+
+def _off_hub(fn, *args):
+    """
+    Run a full-cost bcrypt call on gevent's native threadpool when serving
+    under gevent. Production is one gevent worker, so ~250ms of hashing on
+    the hub thread stalls every other in-flight request; bcrypt releases
+    the GIL, so on a pool thread the hub keeps serving them. Outside gevent
+    (scripts, flask run) it just calls fn.
+    """
+    try:
+        from gevent import get_hub, monkey
+    except ImportError:
+        return fn(*args)
+    if not monkey.is_module_patched('socket'):
+        return fn(*args)
+    return get_hub().threadpool.apply(fn, args)
+
+
+def _hash_password(password: str) -> str:
+    return _off_hub(
+        bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    ).decode('utf-8')
+
+
+def _unusable_password_hash() -> str:
+    """
+    password_hash for accounts that never log in with a password (Google
+    sign-in, auto-provisioned). The input is 256 random bits, so there's
+    nothing for a work factor to protect — use bcrypt's minimum cost rather
+    than burning a full hash on every signup. Hex, not raw bytes: bcrypt
+    3.x rejects NUL bytes, which token_bytes(32) contains ~12% of the time.
+    """
+    return bcrypt.hashpw(secrets.token_hex(32).encode('ascii'), bcrypt.gensalt(rounds=4)).decode('utf-8')
 
 def mark_onboarding_complete(user_id: int) -> None:
     """Mark user's onboarding as done — prevents wizard from re-appearing."""
@@ -28,16 +69,19 @@ def mark_onboarding_complete(user_id: int) -> None:
 
 def create_user(email, password, plan_type='starter'):
     """Create a new user. Returns user_id on success, None if email already exists."""
+    # Hash before checking out a pooled connection — it's the slow part.
+    password_hash = _hash_password(password)
     conn = cursor = None
     try:
         conn, cursor = get_db()
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         cursor.execute(
             'INSERT INTO users (email, password_hash, plan_type) VALUES (%s, %s, %s) RETURNING id',
             (email, password_hash, plan_type)
         )
         user_id = cursor.fetchone()['id']
         conn.commit()
+        from .analytics import invalidate_user_stats_cache
+        invalidate_user_stats_cache()
         return user_id
     except psycopg2.IntegrityError:
         if conn:
@@ -62,12 +106,10 @@ def create_user(email, password, plan_type='starter'):
 def verify_user(email, password):
     """Verify user credentials. Returns user dict on success, None otherwise."""
     try:
-        conn, cursor = get_db()
-        cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+        with db_transaction() as (conn, cursor):
+            cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
+            user = cursor.fetchone()
+        if user and _off_hub(bcrypt.checkpw, password.encode('utf-8'), user['password_hash'].encode('utf-8')):
             return dict(user)
         return None
     except Exception as e:
@@ -79,11 +121,9 @@ def verify_user(email, password):
 def get_user_by_id(user_id):
     """Get user by ID. Returns None on missing row or DB error."""
     try:
-        conn, cursor = get_db()
-        cursor.execute('SELECT * FROM users WHERE id = %s', (user_id,))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db_transaction() as (conn, cursor):
+            cursor.execute('SELECT * FROM users WHERE id = %s', (user_id,))
+            user = cursor.fetchone()
         return dict(user) if user else None
     except Exception as e:
         import logging
@@ -94,11 +134,9 @@ def get_user_by_id(user_id):
 def get_user_by_email(email):
     """Get user by email. Returns None on missing row or DB error."""
     try:
-        conn, cursor = get_db()
-        cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db_transaction() as (conn, cursor):
+            cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
+            user = cursor.fetchone()
         return dict(user) if user else None
     except Exception as e:
         import logging
@@ -195,10 +233,7 @@ def create_or_link_google_user(google_id, email, return_is_new: bool = False):
         # 3. Brand-new user — store a random bcrypt hash so password_hash
         #    NOT NULL is satisfied, but this account can never be accessed
         #    via password login (the hash is unguessable).
-        import secrets as _secrets
-        random_hash = bcrypt.hashpw(
-            _secrets.token_bytes(32), bcrypt.gensalt()
-        ).decode('utf-8')
+        random_hash = _unusable_password_hash()
 
         cursor.execute(
             """
@@ -265,9 +300,7 @@ def create_or_link_shopify_user(email: str):
         if user:
             return dict(user)
 
-        random_hash = bcrypt.hashpw(
-            secrets.token_bytes(32), bcrypt.gensalt()
-        ).decode('utf-8')
+        random_hash = _unusable_password_hash()
 
         cursor.execute(
             """
@@ -358,8 +391,7 @@ def delete_password_reset_token(token):
 
 def update_user_password(user_id, new_password):
     """Hash and save a new password for a user."""
-    import bcrypt
-    hashed = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed = _hash_password(new_password)
     conn = cursor = None
     try:
         conn, cursor = get_db()
@@ -1,7 +1,8 @@
 """
 models/webhooks.py
 ------------------
-Webhook config storage, signing secret management, and delivery log.
+Webhook config storage, signing secret management, delivery log, and
+inbound-delivery idempotency keys.
 """
 import json
 import secrets
@@ -274,3 +275,54 @@ def _calc_cost(input_tokens, output_tokens):
     )
 
 
+def claim_idempotency_key(key: str) -> bool:
+    """
+    Atomically record an inbound delivery key. True the first time a key is
+    seen (caller should process the event), False for a repeat delivery.
+    Fails open — if the table is missing or the DB errors, returns True so a
+    real event is never dropped; handlers keep their own business-level
+    duplicate checks behind this.
+    """
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        cursor.execute(
+            "INSERT INTO idempotency_keys (key) VALUES (%s) ON CONFLICT (key) DO NOTHING",
+            (key,)
+        )
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        return claimed
+    except Exception:
+        if conn:
+            try: conn.rollback()
+            except Exception: pass
+        return True
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
+
+
+def release_idempotency_key(key: str) -> None:
+    """Forget a claimed key so the sender's retry is processed — call when
+    handling failed after claim_idempotency_key() returned True."""
+    conn = cursor = None
+    try:
+        conn, cursor = get_db()
+        cursor.execute("DELETE FROM idempotency_keys WHERE key = %s", (key,))
+        conn.commit()
+    except Exception:
+        if conn:
+            try: conn.rollback()
+            except Exception: pass
+    finally:
+        if cursor:
+            try: cursor.close()
+            except Exception: pass
+        if conn:
+            try: conn.close()
+            except Exception: pass
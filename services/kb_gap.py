@@ -166,6 +166,7 @@ def add_gap_to_kb(
         return {'success': False, 'error': 'Answer is too short to be useful.'}
 
     try:
+        import cache_utils
         import models as _m
         import uuid
 
@@ -181,6 +182,7 @@ def add_gap_to_kb(
             'embedding':     None,
         }
         _m.save_faqs(client_id, [faq])
+        cache_utils.bump_kb_version(client_id)
 
         # Mark the gap resolved so it disappears from AI Suggestions.
         # mark_kb_gap_resolved only needs gap_id (no client_id param).
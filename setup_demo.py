@@ -157,11 +157,13 @@ def setup_demo():
             }
         ]
         
-        for i, faq in enumerate(demo_faqs):
-            cursor.execute(
-                'INSERT INTO faqs (client_id, faq_id, question, answer, triggers, created_at) VALUES (?, ?, ?, ?, ?, datetime("now"))',
-                ('demo', f'demo_faq_{i+1}', faq['question'], faq['answer'], json.dumps(faq['triggers']))
-            )
+        # One executemany in the same transaction as the DELETE above —
+        # committed (and synced) once.
+        cursor.executemany(
+            'INSERT INTO faqs (client_id, faq_id, question, answer, triggers, created_at) VALUES (?, ?, ?, ?, ?, datetime("now"))',
+            [('demo', f'demo_faq_{i+1}', faq['question'], faq['answer'], json.dumps(faq['triggers']))
+             for i, faq in enumerate(demo_faqs)]
+        )
         
         conn.commit()
         conn.close()
@@ -115,6 +115,37 @@ check('missing SHOPIFY_APP_CLIENT_SECRET env var fails closed, not open',
       not webhooks._verify_shopify_app_signature(body, app_sig))
 os.environ['SHOPIFY_APP_CLIENT_SECRET'] = app_secret  # restore for anything after
 
+print()
+print('app_utils.py — verify_webhook_request (/api/webhook/* auth)')
+import app_utils
+wh_secret = 'inbound-webhook-secret'
+ts = 1_700_000_000
+signed = {
+    'X-Webhook-Timestamp': str(ts),
+    'X-Webhook-Signature': 'sha256=' + hmac_module.new(
+        wh_secret.encode(), f'{ts}.'.encode() + body, hashlib.sha256).hexdigest(),
+}
+check('correct signature inside the window verifies',
+      app_utils.verify_webhook_request(signed, body, wh_secret, now=ts + 10))
+check('tampered body fails',
+      not app_utils.verify_webhook_request(signed, body + b'x', wh_secret, now=ts + 10))
+check('stale timestamp (replay) fails',
+      not app_utils.verify_webhook_request(signed, body, wh_secret, now=ts + 301))
+check('signature with no timestamp fails',
+      not app_utils.verify_webhook_request(
+          {'X-Webhook-Signature': signed['X-Webhook-Signature']}, body, wh_secret, now=ts))
+check('legacy X-Webhook-Secret still accepted',
+      app_utils.verify_webhook_request({'X-Webhook-Secret': wh_secret}, body, wh_secret))
+check('legacy header with wrong secret fails',
+      not app_utils.verify_webhook_request({'X-Webhook-Secret': 'nope'}, body, wh_secret))
+check('unconfigured secret fails closed',
+      not app_utils.verify_webhook_request({'X-Webhook-Secret': ''}, body, ''))
+check('non-ASCII signature fails instead of raising',
+      not app_utils.verify_webhook_request(
+          {**signed, 'X-Webhook-Signature': 'sha256=\u00e9'}, body, wh_secret, now=ts + 10))
+check('non-ASCII legacy secret fails instead of raising',
+      not app_utils.verify_webhook_request({'X-Webhook-Secret': '\u00e9'}, body, wh_secret))
+
 print()
 print(f'{passed} passed, {failed} failed')
 sys.exit(1 if failed else 0)
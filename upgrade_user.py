@@ -4,14 +4,31 @@ Usage: python upgrade_user.py
 """
 
 import models
+from app_utils import EMAIL_RE
+
+VALID_PLANS = frozenset({'free', 'starter', 'agency', 'enterprise'})
+
+# Fixed output, built once at import and printed with a single call each.
+RULE   = "=" * 50
+BANNER = f"\n{RULE}\nUSER PLAN UPGRADE TOOL\n{RULE}\n"
+MENU   = (
+    "\n Available plans:\n"
+    "  1. free\n"
+    "  2. starter\n"
+    "  3. agency\n"
+    "  4. enterprise"
+)
+
 
 def upgrade_user():
     """Upgrade a user's plan"""
-    print("\n" + "="*50)
-    print("USER PLAN UPGRADE TOOL")
-    print("="*50 + "\n")
+    print(BANNER)
     
-    email = input("Enter user email: ").strip()
+    # Signup stores emails lowercased, so match that here.
+    email = input("Enter user email: ").strip().lower()
+    if not EMAIL_RE.match(email):
+        print(f"❌ Invalid email: {email}")
+        return
     
     user = models.get_user_by_email(email)
     
@@ -22,17 +39,17 @@ def upgrade_user():
     print(f"\n📧 User found: {email}")
     print(f"📊 Current plan: {user['plan_type']}")
     
-    print("\n Available plans:")
-    print("  1. free")
-    print("  2. starter")
-    print("  3. agency")
-    print("  4. enterprise")
+    print(MENU)
     
     new_plan = input("\nEnter new plan (or press Enter to cancel): ").strip().lower()
     
-    if new_plan not in ['free', 'starter', 'agency', 'enterprise']:
+    if new_plan not in VALID_PLANS:
         print("❌ Invalid plan. Cancelled.")
         return
+
+    if new_plan == user['plan_type']:
+        print(f"ℹ️  {email} is already on '{new_plan}'. Nothing to change.")
+        return
     
     # Confirm
     confirm = input(f"\n⚠️  Change {email} from '{user['plan_type']}' to '{new_plan}'? (yes/no): ").strip().lower()
@@ -41,15 +58,22 @@ def upgrade_user():
         print("❌ Cancelled.")
         return
     
-    # Update database
-    conn = models.get_db()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE users SET plan_type = ? WHERE email = ?", (new_plan, email))
-    conn.commit()
-    conn.close()
-    
-    print(f"\n✅ Success! {email} upgraded to '{new_plan}'")
-    print("="*50 + "\n")
+    # Update database — pooled connection, committed and returned on exit
+    with models.db_transaction() as (conn, cursor):
+        cursor.execute(
+            "UPDATE users SET plan_type = %s WHERE email = %s RETURNING plan_type",
+            (new_plan, email)
+        )
+        row = cursor.fetchone()
+
+    # RETURNING tells us whether the row was still there when we wrote it
+    # (it could have been deleted since the lookup above).
+    if not row:
+        print(f"❌ User not found: {email}")
+        return
+
+    print(f"\n✅ Success! {email} upgraded to '{row['plan_type']}'")
+    print(RULE + "\n")
 
 if __name__ == '__main__':
     upgrade_user()
\ No newline at end of file
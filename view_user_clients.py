@@ -1,7 +1,11 @@
+import sys
+
 import models
+from app_utils import EMAIL_RE
 
-email = input("Enter user email: ").strip()
-user = models.get_user_by_email(email)
+# Signup stores emails lowercased, so match that here.
+email = input("Enter user email: ").strip().lower()
+user  = models.get_user_by_email(email) if EMAIL_RE.match(email) else None
 
 if not user:
     print(f"❌ User not found: {email}")
@@ -14,8 +18,11 @@ else:
     
     if clients:
         print("-"*60)
-        for client in clients:
-            print(f"  • {client['company_name']} (ID: {client['client_id']})")
+        # One write for the whole list instead of a print() per client.
+        sys.stdout.write("\n".join(
+            f"  • {client['company_name']} (ID: {client['client_id']})"
+            for client in clients
+        ) + "\n")
         print("-"*60)
     else:
         print("  No clients yet")